@@ -4,12 +4,27 @@ __init__
 """
 from __future__ import absolute_import
 from .media_file import MediaFile
+from .cache import BoxCache
+from .item_properties import ItemProperties
+from .item_reader import ItemReader
+from .item_references import ItemReferences
+from .preview_reader import PreviewReader
+from .push_parser import PushParser
+from .async_parser import aiter_boxes
+from .async_parser import aparse
 from .box import get_atom_list
+from .scan import scan
+from .sample_index import FragmentSampleIndex
+from .sample_index import SampleIndex
+from .sample_reader import SampleReader
+from .segment_index import SegmentIndex
 from . import ac3
 from . import ac4
+from . import async_parser
 from . import avc
 from . import avs
 from . import box
+from . import cache
 from . import dinf
 from . import edts
 from . import etyp
@@ -21,6 +36,9 @@ from . import heif
 from . import hvc
 from . import iinf
 from . import iloc
+from . import item_properties
+from . import item_reader
+from . import item_references
 from . import ipro
 from . import iprp
 from . import mdat
@@ -34,7 +52,12 @@ from . import mp4
 from . import mvex
 from . import opus
 from . import pitm
+from . import preview_reader
+from . import push_parser
 from . import qtff
+from . import sample_index
+from . import sample_reader
+from . import segment_index
 from . import sidx
 from . import sgpd
 from . import stbl
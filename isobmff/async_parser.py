@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import io
+
+from .box import Box
+from .box import read_box
+from .buffer_file import BufferFile
+from .push_parser import MAX_HEADER_SIZE
+from .push_parser import PUSH_SKIP_BOX_TYPES
+from .push_parser import PushParser
+from .push_parser import parse_box_header
+
+
+# read size for stream sources
+AREAD_CHUNK_SIZE = 64 * 1024
+
+
+async def aiter_boxes(
+    reader, debug=0, data_callback=None, skip_types=PUSH_SKIP_BOX_TYPES
+):
+    """yield the top-level boxes of an async source as they are parsed
+
+    reader is either a stream (anything with an async read(n) method,
+    e.g. asyncio.StreamReader), or a random-access source (with async
+    seek(offset, whence) and read(n) methods, e.g. an aiofiles file).
+
+    Streams are parsed with a PushParser (see PushParser for skip_types
+    and data_callback). In random-access sources, the payload of the
+    boxes in skip_types is not read at all, so data_callback is not used.
+
+    The event loop gets control back after each box.
+    """
+    if hasattr(reader, "seek"):
+        boxes = aiter_boxes_random_access(reader, debug, skip_types)
+    else:
+        boxes = aiter_boxes_stream(reader, debug, data_callback, skip_types)
+    async for box in boxes:
+        yield box
+        await asyncio.sleep(0)
+
+
+async def aiter_boxes_stream(reader, debug, data_callback, skip_types):
+    parser = PushParser(debug, data_callback, skip_types)
+    while True:
+        data = await reader.read(AREAD_CHUNK_SIZE)
+        if not data:
+            break
+        for box in parser.feed(data):
+            yield box
+    for box in parser.close():
+        yield box
+
+
+async def aiter_boxes_random_access(reader, debug, skip_types):
+    # parent of the top-level boxes (it numbers their paths)
+    root = Box(0, 0, "", 0, None, None, debug)
+    offset = 0
+    while True:
+        await reader.seek(offset, io.SEEK_SET)
+        data = await reader.read(MAX_HEADER_SIZE)
+        header = parse_box_header(data, offset)
+        if header is None:
+            if data:
+                raise Exception(f"error: truncated box header at 0x{offset:08x}")
+            return
+        size, header_size, box_type = header
+        if size == 0:
+            # box extends to the end of the file
+            size = await reader.seek(0, io.SEEK_END) - offset
+        if box_type in skip_types:
+            # only the header is needed
+            data = data[:header_size]
+        elif size <= len(data):
+            data = data[:size]
+        else:
+            await reader.seek(offset + len(data), io.SEEK_SET)
+            data += await reader.read(size - len(data))
+            if len(data) < size:
+                raise Exception(
+                    f"error: truncated box type: {box_type} at 0x{offset:08x}"
+                )
+        file = BufferFile(data, offset)
+        yield read_box(file, root.path, debug, root, offset + size)
+        offset += size
+
+
+async def aparse(reader, debug=0, data_callback=None, skip_types=PUSH_SKIP_BOX_TYPES):
+    """parse an async source, and get the list of its top-level boxes
+
+    See aiter_boxes().
+    """
+    return [
+        box
+        async for box in aiter_boxes(reader, debug, data_callback, skip_types)
+    ]
@@ -1,15 +1,23 @@
 # -*- coding: utf-8 -*-
 
+import array
+import io
 import re
 import string
 import struct
+import sys
 from enum import Enum
 
+from .buffer_file import BufferFile
+
 
 TAB_SIZE = 2
 
 
 def escape_value(s):
+    if isinstance(s, memoryview):
+        # zero-copy bytes (see read_bytes())
+        return s.tobytes()
     if isinstance(s, str):
         # escape string
         return "".join(c if c in string.printable else "\\x%02x" % ord(c) for c in s)
@@ -30,23 +38,129 @@ def tuples_to_string(tuples, indent):
 
 def find_subbox(box, full_path):
     # check if this is the box
-    if box.path.strip() == full_path.strip():
+    full_path = full_path.strip()
+    if box.path.strip() == full_path:
         return box
+    # lazy boxes need their payload to find their children
+    box.load()
     # look for boxes and lists of boxes
-    b = Box
-    for var, child in box.__dict__.items():
-        if issubclass(child.__class__, b):
-            return find_subbox(child, full_path)
-        elif issubclass(child.__class__, list):
-            for item in child:
-                if issubclass(item.__class__, b):
-                    if full_path.strip() == item.path.strip() or full_path.startswith(
-                        item.path + "/"
-                    ):
-                        return find_subbox(item, full_path)
+    for child in get_subboxes(box):
+        if full_path == child.path or full_path.startswith(child.path + "/"):
+            subbox = find_subbox(child, full_path)
+            if subbox is not None:
+                return subbox
+    return None
+
+
+# field slots of each box class (the ones of its subclasses of Box and
+# FullBox), as (name, member descriptor) tuples
+FIELD_SLOTS = {}
+
+
+def get_field_slots(cls):
+    field_slots = FIELD_SLOTS.get(cls)
+    if field_slots is None:
+        field_slots = [
+            (name, klass.__dict__[name])
+            for klass in cls.__mro__
+            if klass not in (Box, FullBox)
+            for name in klass.__dict__.get("__slots__", ())
+        ]
+        FIELD_SLOTS[cls] = field_slots
+    return field_slots
+
+
+def get_fields(box):
+    """get the field values of a box (both __dict__ and slot fields)"""
+    values = list(getattr(box, "__dict__", {}).values())
+    for _, slot in get_field_slots(type(box)):
+        try:
+            # bypass __getattr__: unset fields must not load lazy boxes
+            values.append(slot.__get__(box))
+        except AttributeError:
+            pass
+    return values
+
+
+def get_subboxes(box):
+    """get the boxes contained in a box (as attributes or lists)"""
+    subboxes = []
+    for child in get_fields(box):
+        if isinstance(child, Box):
+            subboxes.append(child)
+        elif isinstance(child, list):
+            subboxes += [item for item in child if isinstance(item, Box)]
+    return subboxes
+
+
+def set_root(box, root):
+    """set the root (see Box.root) of a box tree"""
+    box.root = root
+    for child in get_subboxes(box):
+        set_root(child, root)
+
+
+def find_child(box, box_type):
+    """get the first descendant of box with the given box type"""
+    box.load()
+    for child in get_subboxes(box):
+        if child.box_type == box_type:
+            return child
+    for child in get_subboxes(box):
+        descendant = find_child(child, box_type)
+        if descendant is not None:
+            return descendant
     return None
 
 
+def iter_subboxes(box, depth, types=None):
+    """yield a box and its descendants up to depth levels below it"""
+    if types is None or box.box_type in types:
+        yield box
+    if depth > 0:
+        box.load()
+        for child in get_subboxes(box):
+            yield from iter_subboxes(child, depth - 1, types)
+
+
+class PathIndex:
+    """Box lookup tables, filled in as boxes are read.
+
+    * paths: maps the box path (see Box.get_path()) to the box
+    * types: maps the (full) box type to a list of boxes, in read order
+    """
+
+    def __init__(self):
+        self.paths = {}
+        self.types = {}
+
+    def add(self, box):
+        self.paths[box.path] = box
+        self.types.setdefault(box.box_type, []).append(box)
+
+    def add_tree(self, box):
+        """add a box and its descendants"""
+        self.add(box)
+        for child in get_subboxes(box):
+            self.add_tree(child)
+
+    def remove(self, box):
+        """remove a box and its descendants"""
+        if self.paths.get(box.path) is box:
+            del self.paths[box.path]
+        boxes = self.types.get(box.box_type, [])
+        if box in boxes:
+            boxes.remove(box)
+        for child in get_subboxes(box):
+            self.remove(child)
+
+    def find(self, full_path):
+        return self.paths.get(full_path.strip())
+
+    def find_all(self, box_type):
+        return self.types.get(box_type, [])
+
+
 # decode a bytes string into a string containing only characters
 # from the POSIX portable filename character set. For all other
 # characters, use "\\x%02x".
@@ -78,24 +192,129 @@ def decode_posix_portable_filename(box_type):
     return box_type_str
 
 
+# box type registry: maps the full box type (fourcc, or the extended
+# type for uuid boxes) to a (box class, class type) tuple. It is
+# populated at class definition time, so that read_box() can find the
+# right class with a single dict lookup.
+BOX_REGISTRY = {}
+
+
+def register_box_class(cls):
+    box_type = cls.__dict__.get("box_type")
+    if not isinstance(box_type, bytes):
+        # abstract classes (e.g. SampleEntry) have no box type, and
+        # classes shared by several types keep it in a slot
+        return
+    # on duplicate box types, the first definition wins
+    BOX_REGISTRY.setdefault(box_type, (cls, get_class_type(cls)))
+
+
+def get_box_class(full_box_type):
+    """get the (box class, class type) tuple for a box type, or None"""
+    return BOX_REGISTRY.get(full_box_type)
+
+
 # ISO/IEC 14496-12:2022, Section 4.2.2
 class Box:
+    # the common fields live in slots, so they do not need a per-box
+    # dict entry. Subclasses get a __dict__ for their own fields unless
+    # they define __slots__ too (as the ones with many instances do)
+    __slots__ = (
+        "offset",
+        "payload_offset",
+        "path",
+        "subpath",
+        "size",
+        "largesize",
+        "max_offset",
+        "debug",
+        "lazy_file",
+        "root",
+    )
     box_type = None
+    bulk_read = True
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        register_box_class(cls)
 
     def __init__(
         self, offset, payload_offset, path, size, largesize, max_offset, debug
     ):
+        # lazy mode: file to read the payload from, the first time a
+        # missing attribute is accessed (None once read)
+        self.lazy_file = None
+        # parent of the top-level boxes (usually the MediaFile), which
+        # holds the per-file settings (see lazy, bulk, path_index, and
+        # box_filter below). None for the root itself
+        self.root = None
         self.offset = offset
         self.payload_offset = payload_offset
         self.path = path
-        self.subpath = {}
+        # child box type counters (see get_path()). Only allocated for
+        # boxes with children, and dropped once they are read
+        self.subpath = None
         self.size = size
         self.largesize = largesize
-        self.max_offset = self.offset + self.get_size()
-        if max_offset is not None:
-            self.max_offset = min(self.max_offset, max_offset)
+        if size == 0:
+            # box extends to the end of the enclosing container (or file)
+            self.max_offset = max_offset
+        else:
+            self.max_offset = self.offset + self.get_size()
+            if max_offset is not None:
+                self.max_offset = min(self.max_offset, max_offset)
         self.debug = debug
 
+    # lazy mode: only the box header is read at parse time, and the
+    # payload is read the first time a missing attribute is accessed
+    @property
+    def lazy(self):
+        return self.root is not None and self.root.lazy
+
+    # bulk mode: the full payload is read at once, and read() parses it
+    # from memory (see read_bulk())
+    @property
+    def bulk(self):
+        return self.root is not None and self.root.bulk
+
+    # PathIndex shared by all the boxes of a file
+    @property
+    def path_index(self):
+        return self.root.path_index if self.root is not None else None
+
+    # optional BoxFilter: boxes that do not match it are not read
+    @property
+    def box_filter(self):
+        return self.root.box_filter if self.root is not None else None
+
+    def __getattr__(self, name):
+        # only called when normal attribute lookup fails
+        if name.startswith("__") or name == "lazy_file" or self.lazy_file is None:
+            raise AttributeError(
+                f"'{self.__class__.__name__}' object has no attribute '{name}'"
+            )
+        self.load()
+        return getattr(self, name)
+
+    def load(self):
+        """read the payload of a lazy box"""
+        file = self.lazy_file
+        if file is None:
+            return
+        self.lazy_file = None
+        position = file.tell()
+        file.seek(self.get_body_offset())
+        if self.bulk:
+            self.read_bulk(file)
+        else:
+            self.read(file)
+        self.subpath = None
+        file.seek(position)
+
+    def get_body_offset(self):
+        """get the offset where read() starts reading"""
+        return self.payload_offset
+
     def contents(self):
         # a non-Box class has no parent
         tuples = ()
@@ -120,6 +339,8 @@ class Box:
     @classmethod
     def get_path(cls, path, box_type, parent):
         box_type_str = decode_posix_portable_filename(box_type)
+        if parent is not None and parent.subpath is None:
+            parent.subpath = {}
         if parent is None:
             new_path = path + "/" + box_type_str
         elif box_type_str not in parent.subpath:
@@ -132,6 +353,9 @@ class Box:
 
     def get_size(self):
         """get box size, including header"""
+        if self.size == 0:
+            # box extends to the end of the enclosing container (or file)
+            return self.max_offset - self.offset
         return self.size if self.largesize is None else self.largesize
 
     # default read() operation
@@ -139,10 +363,23 @@ class Box:
     def read(self, file):
         self.read_as_bytes(file)
 
+    # read the payload with a single read() call, and then parse it
+    # from memory
+    def read_bulk(self, file):
+        if not self.bulk_read or hasattr(file, "read_view"):
+            # already in memory, or not worth it (e.g. mdat)
+            self.read(file)
+            return
+        offset = file.tell()
+        buf = BufferFile(file.read(self.max_offset - offset), offset)
+        self.read(buf)
+        # keep the file position where read() left it
+        file.seek(buf.tell())
+
     # read the remaining bytes as simple bytes
     def read_as_bytes(self, file):
         offset = file.tell()
-        return file.read(self.max_offset - offset)
+        return read_bytes(file, self.max_offset - offset)
 
     # read the remaining bytes as boxes
     def read_box_list(self, file):
@@ -155,8 +392,8 @@ class Box:
         return box_list
 
     # read a single box
-    def read_box(self, file):
-        return read_box(file, self.path, self.debug, self, self.max_offset)
+    def read_box(self, file, box_class=None):
+        return read_box(file, self.path, self.debug, self, self.max_offset, box_class)
 
     def write(self, file):
         """write box to file"""
@@ -165,6 +402,7 @@ class Box:
 
 # ISO/IEC 14496-12:2022, Section 4.2.2
 class FullBox(Box):
+    __slots__ = ("version", "flags")
     box_type = None
 
     def __init__(
@@ -185,6 +423,10 @@ class FullBox(Box):
         self.version = version
         self.flags = flags
 
+    def get_body_offset(self):
+        # skip the version and flags fields
+        return self.payload_offset + 4
+
     def contents(self):
         tuples = super().contents()
         tuples += (("version", self.version),)
@@ -207,6 +449,8 @@ class ContainerBox(Box):
 
 
 class UnimplementedBox(Box):
+    __slots__ = ("box_type", "bytes")
+
     def __init__(
         self, offset, payload_offset, path, box_type, size, largesize, max_offset, debug
     ):
@@ -221,7 +465,30 @@ class UnimplementedBox(Box):
     def contents(self):
         tuples = super().contents()
         if self.debug > 2:
-            tuples += (("bytes", f"{self.bytes}"),)
+            tuples += (("bytes", self.bytes),)
+        return tuples
+
+
+class SkippedBox(Box):
+    # box filtered out by a BoxFilter: only its header has been read
+    # (never its payload, not even in bulk mode)
+    __slots__ = ("box_type",)
+    bulk_read = False
+
+    def __init__(
+        self, offset, payload_offset, path, box_type, size, largesize, max_offset, debug
+    ):
+        self.box_type = box_type
+        super().__init__(
+            offset, payload_offset, path, size, largesize, max_offset, debug
+        )
+
+    def read(self, file):
+        file.seek(self.max_offset)
+
+    def contents(self):
+        tuples = super().contents()
+        tuples += (("skipped", True),)
         return tuples
 
 
@@ -247,6 +514,51 @@ def read_int_generic(file, length, signed):
     return int.from_bytes(byte_array, byteorder="big", signed=signed)
 
 
+def read_struct(file, fmt):
+    """read the fixed-layout fields of a precompiled struct.Struct"""
+    offset = file.tell()
+    unpack = getattr(file, "unpack", None)
+    if unpack is not None and offset + fmt.size <= file.max_offset:
+        return unpack(fmt)
+    data = file.read(fmt.size)
+    if len(data) < fmt.size:
+        raise Exception(
+            f"error: truncated fields at 0x{offset:08x} "
+            f"({len(data)} of {fmt.size} bytes)"
+        )
+    return fmt.unpack(data)
+
+
+def read_struct_array(file, fmt, count):
+    """read count consecutive fixed-layout records"""
+    offset = file.tell()
+    size = fmt.size * count
+    iter_unpack = getattr(file, "iter_unpack", None)
+    if iter_unpack is not None and offset + size <= file.max_offset:
+        return iter_unpack(fmt, count)
+    data = file.read(size)
+    if len(data) < size:
+        raise Exception(
+            f"error: truncated records at 0x{offset:08x} ({len(data)} of {size} bytes)"
+        )
+    return fmt.iter_unpack(data)
+
+
+def read_array(file, typecode, count):
+    """read count big-endian integers into an array.array
+
+    typecode selects the field size and signedness: "I"/"i" for 32-bit
+    fields, and "Q"/"q" for 64-bit fields.
+    """
+    values = array.array(typecode)
+    data = read_bytes(file, values.itemsize * count)
+    # drop the partial item of truncated tables
+    values.frombytes(data[: len(data) - len(data) % values.itemsize])
+    if sys.byteorder == "little":
+        values.byteswap()
+    return values
+
+
 def read_fixed_size_string(file, length):
     return file.read(length).decode("ascii")
 
@@ -264,12 +576,21 @@ def read_utf8string(file, max_len):
         return ""
     bstr = file.read(1)
     nbytes = 1
-    while bstr[-1] != 0 and nbytes < max_len:
-        bstr += file.read(1)
+    while bstr and bstr[-1] != 0 and nbytes < max_len:
+        byte = file.read(1)
+        if not byte:
+            break
+        bstr += byte
+        nbytes += 1
     return bstr.decode("ascii", errors="ignore")
 
 
 def read_bytes(file, length):
+    # buffer-backed files (see BufferFile) return zero-copy memoryview
+    # slices instead of bytes copies
+    read_view = getattr(file, "read_view", None)
+    if read_view is not None:
+        return read_view(length)
     return file.read(length)
 
 
@@ -291,7 +612,9 @@ def int_to_fixed_point_16_16(num):
     return int_part + frac_part
 
 
-def get_class_list(cls, res=[]):
+def get_class_list(cls, res=None):
+    if res is None:
+        res = []
     subclasses = getattr(cls, "__subclasses__")()
     for subclass in subclasses:
         get_class_list(subclass, res)
@@ -300,8 +623,7 @@ def get_class_list(cls, res=[]):
 
 
 def get_atom_list():
-    box_classes = get_class_list(Box)
-    return [box_class.box_type for box_class in box_classes]
+    return list(BOX_REGISTRY.keys())
 
 
 def get_class_type(cls):
@@ -314,8 +636,21 @@ def get_class_type(cls):
     return "Unknown"
 
 
+def get_box_size(offset, size, largesize, max_offset):
+    """get box size, including header, from the BoxHeader fields"""
+    if size == 0:
+        return max_offset - offset
+    return size if largesize is None else largesize
+
+
 # TODO(chema): move function to Box/BoxHeader/FullBox/FullBoxHeader
-def read_box(file, path, debug, parent=None, max_offset=None):
+def read_box(file, path, debug, parent=None, max_offset=None, box_class=None):
+    """read a box, using the class registered for its box type
+
+    box_class forces the class of the box, for boxes whose type does
+    not select their class (e.g. the "iref" entries, whose box type is
+    the reference type).
+    """
     # 1. read the BoxHeader fields
     offset = file.tell()
     if max_offset is not None and (max_offset - file.tell()) < 4:
@@ -336,13 +671,20 @@ def read_box(file, path, debug, parent=None, max_offset=None):
             )
             return None
         box_type = read_fourcc(file)
-    except:
+    except TimeoutError:
+        # e.g. a per-file parsing timeout (see isobmff-parse.py)
+        raise
+    except Exception:
         raise Exception(f"error: cannot read box type at location 0x{offset+4:08x}")
     if debug > 2:
         print(f"read_box() offset: 0x{offset:08x} size: 0x{size:08x} type: {box_type}")
     largesize = None
     if size == 0:
-        raise Exception(f"error: UNIMPLEMENTED size=0 BoxHeader (Section 4.2.2 Page 8)")
+        # box extends to the end of the enclosing container, or to the
+        # end of the file (e.g. the last mdat of a live capture)
+        if max_offset is None:
+            max_offset = file.seek(0, io.SEEK_END)
+            file.seek(offset + 8)
     elif size == 1:
         if max_offset is not None and (max_offset - file.tell()) < 8:
             raise Exception(
@@ -363,46 +705,65 @@ def read_box(file, path, debug, parent=None, max_offset=None):
     # 2. calculate the full path
     new_path = Box.get_path(path, box_type, parent)
     # 3. find the right Box/FullBox
-    box_classes = get_class_list(Box)
-    box = None
-    for box_class in box_classes:
-        if box_class.box_type == full_box_type:
-            class_type = get_class_type(box_class)
-            if class_type == "Box":
-                box = box_class(
-                    offset=offset,
-                    payload_offset=payload_offset,
-                    path=new_path,
-                    size=size,
-                    largesize=largesize,
-                    max_offset=max_offset,
-                    debug=debug,
-                )
-            elif class_type == "FullBox":
-                if max_offset is not None and (max_offset - file.tell()) < 4:
-                    raise Exception(
-                        f"error: read_box() no space for version/flags field in Box Header max_offset: 0x{max_offset:08x} file.tell(): 0x{file.tell():08x}"
-                    )
-                    return None
-                version = read_uint(file, 1)
-                flags = read_uint(file, 3)
-                box = box_class(
-                    offset=offset,
-                    payload_offset=payload_offset,
-                    path=new_path,
-                    size=size,
-                    largesize=largesize,
-                    version=version,
-                    flags=flags,
-                    max_offset=max_offset,
-                    debug=debug,
+    # the per-file settings come from the root: the parent of the
+    # top-level boxes (usually the MediaFile)
+    root = None
+    if parent is not None:
+        root = parent if parent.root is None else parent.root
+    box_filter = root.box_filter if root is not None else None
+    if box_class is not None:
+        box_entry = (box_class, get_class_type(box_class))
+    else:
+        box_entry = get_box_class(full_box_type)
+    if box_filter is not None and not box_filter.match(
+        new_path, box_type, get_box_size(offset, size, largesize, max_offset)
+    ):
+        box = SkippedBox(
+            offset,
+            payload_offset,
+            new_path,
+            full_box_type,
+            size,
+            largesize,
+            max_offset,
+            debug,
+        )
+    elif box_entry is not None:
+        box_class, class_type = box_entry
+        if class_type == "Box":
+            box = box_class(
+                offset=offset,
+                payload_offset=payload_offset,
+                path=new_path,
+                size=size,
+                largesize=largesize,
+                max_offset=max_offset,
+                debug=debug,
+            )
+        elif class_type == "FullBox":
+            if max_offset is not None and (max_offset - file.tell()) < 4:
+                raise Exception(
+                    f"error: read_box() no space for version/flags field in Box Header max_offset: 0x{max_offset:08x} file.tell(): 0x{file.tell():08x}"
                 )
-            else:
-                raise Exception(f"error: INVALID BOX TYPE (offset: 0x{offset:08x})")
-                break
-            # read the box
-            box.read(file)
-            break
+                return None
+            version = read_uint(file, 1)
+            flags = read_uint(file, 3)
+            box = box_class(
+                offset=offset,
+                payload_offset=payload_offset,
+                path=new_path,
+                size=size,
+                largesize=largesize,
+                version=version,
+                flags=flags,
+                max_offset=max_offset,
+                debug=debug,
+            )
+        else:
+            raise Exception(f"error: INVALID BOX TYPE (offset: 0x{offset:08x})")
+        if box_class.box_type != full_box_type:
+            # class shared by several box types (e.g. iref entries)
+            box.box_type = full_box_type
     else:
         # unimplemented box
         if debug > 0:
@@ -419,5 +780,20 @@ def read_box(file, path, debug, parent=None, max_offset=None):
             max_offset,
             debug,
         )
+    # 4. index the box
+    box.root = root
+    path_index = root.path_index if root is not None else None
+    if path_index is not None:
+        path_index.add(box)
+    # 5. read the box
+    if root is not None and root.lazy:
+        # lazy mode: skip the payload until it is needed
+        box.lazy_file = file
+        file.seek(box.max_offset)
+    elif box.bulk:
+        box.read_bulk(file)
+        box.subpath = None
+    else:
         box.read(file)
+        box.subpath = None
     return box
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import fnmatch
+
+
+class BoxFilter:
+    """Parse-time box filter.
+
+    Boxes that do not match are skipped with a single seek to their end
+    (see SkippedBox), so their subtree is never read.
+
+    * include: list of path globs. A box matches if its path matches one
+      of them, if it is an ancestor of a box that may match (e.g. "/moov"
+      for "/moov/mvhd"), or if it is a descendant of a matching box
+    * exclude: list of path globs. A box does not match if its path, or
+      the path of one of its ancestors, matches one of them
+    * predicate: function called as predicate(path, box_type, size),
+      where size includes the box header. A box does not match if it
+      returns False
+
+    Path globs are matched component by component (so "*" does not match
+    "/"), and use the numbered paths of Box.get_path() (e.g.
+    "/moov/trak*/tkhd" matches "/moov/trak/tkhd" and "/moov/trak2/tkhd").
+    """
+
+    def __init__(self, include=None, exclude=None, predicate=None):
+        self.include = [self.split(pattern) for pattern in include or ()]
+        self.exclude = [self.split(pattern) for pattern in exclude or ()]
+        self.predicate = predicate
+
+    @staticmethod
+    def split(path):
+        return path.strip().strip("/").split("/")
+
+    @staticmethod
+    def match_prefix(names, pattern):
+        # match the common prefix of the path and the pattern
+        return all(fnmatch.fnmatchcase(n, p) for n, p in zip(names, pattern))
+
+    def match(self, path, box_type, size):
+        names = self.split(path)
+        if self.include and not any(
+            self.match_prefix(names, pattern) for pattern in self.include
+        ):
+            return False
+        if any(
+            len(names) >= len(pattern) and self.match_prefix(names, pattern)
+            for pattern in self.exclude
+        ):
+            return False
+        if self.predicate is not None and not self.predicate(path, box_type, size):
+            return False
+        return True
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import io
+
+
+class BufferFile:
+    """Read-only file-like object over a buffer (bytes, mmap, etc.).
+
+    Offsets (tell(), seek()) are absolute file offsets: base_offset is
+    the file offset of the first byte of the buffer. read() returns
+    (small) copies, while read_view() returns zero-copy memoryview
+    slices of the underlying buffer.
+    """
+
+    def __init__(self, buf, base_offset=0):
+        self.view = memoryview(buf)
+        self.base_offset = base_offset
+        self.max_offset = base_offset + len(self.view)
+        self.pos = 0
+
+    def tell(self):
+        return self.base_offset + self.pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset - self.base_offset
+        elif whence == io.SEEK_CUR:
+            pos = self.pos + offset
+        elif whence == io.SEEK_END:
+            pos = len(self.view) + offset
+        else:
+            raise ValueError(f"error: invalid whence ({whence})")
+        if pos < 0:
+            raise ValueError(f"error: negative seek position 0x{offset:08x}")
+        self.pos = pos
+        return self.tell()
+
+    def read_view(self, length=-1):
+        start = self.pos
+        if length is None or length < 0:
+            end = len(self.view)
+        else:
+            end = min(start + length, len(self.view))
+        self.pos = max(start, end)
+        return self.view[start:end]
+
+    def read(self, length=-1):
+        return self.read_view(length).tobytes()
+
+    def unpack(self, fmt):
+        # decode fixed-layout fields with a precompiled struct.Struct
+        values = fmt.unpack_from(self.view, self.pos)
+        self.pos += fmt.size
+        return values
+
+    def iter_unpack(self, fmt, count):
+        # decode count consecutive fixed-layout records
+        view = self.read_view(fmt.size * count)
+        return fmt.iter_unpack(view)
+
+    def peek(self, length=0):
+        # like io.BufferedReader.peek(): do not move the position, and
+        # return at least the requested bytes (when available)
+        length = max(length, io.DEFAULT_BUFFER_SIZE)
+        return self.view[self.pos : self.pos + length].tobytes()
+
+    def close(self):
+        self.view.release()
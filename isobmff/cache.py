@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+import pickle
+import tempfile
+
+from .box import set_root
+from .scan import BoxIndex
+
+
+# bump when the cache entry layout changes
+CACHE_FORMAT_VERSION = 4
+CACHE_SUFFIX = ".isobmff-cache"
+
+# fingerprint of the library source code (see get_library_version())
+library_version = None
+
+
+def get_library_version():
+    """get a fingerprint of the isobmff source code
+
+    Any change in the library (e.g. an upgrade, or a fix in a read()
+    method) changes the fingerprint, and therefore invalidates all the
+    existing cache entries.
+    """
+    global library_version
+    if library_version is None:
+        digest = hashlib.sha1()
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        for name in sorted(os.listdir(package_dir)):
+            if name.endswith(".py"):
+                with open(os.path.join(package_dir, name), "rb") as fin:
+                    digest.update(name.encode("utf-8"))
+                    digest.update(fin.read())
+        library_version = digest.hexdigest()
+    return library_version
+
+
+class BoxCache:
+    """Persistent on-disk cache of parsed box trees.
+
+    Each entry holds a header index of the top-level boxes of a file (a
+    BoxIndex), and the decoded top-level boxes whose pickled size is up
+    to max_box_size. When an entry is loaded, the larger boxes are
+    parsed again from the file, so large files still skip most of the
+    parsing work (e.g. the "moof" boxes of a long fragmented file).
+
+    Entries are keyed by the identity of the parsed file (device, inode,
+    size, and mtime_ns), so any change in the file invalidates its entry.
+    The total size of the cache directory is bounded by max_size: the
+    least recently used entries are evicted first.
+
+    Entries are pickle files, so the cache directory must only be
+    writable by trusted users.
+    """
+
+    def __init__(
+        self,
+        cache_dir,
+        max_size=256 * 1024 * 1024,
+        max_entry_size=None,
+        max_box_size=None,
+    ):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.max_entry_size = (
+            max_entry_size if max_entry_size is not None else max_size // 16
+        )
+        # largest pickled top-level box kept in an entry. Larger boxes
+        # are only indexed, and parsed again when the entry is loaded
+        self.max_box_size = (
+            max_box_size if max_box_size is not None else self.max_entry_size // 4
+        )
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+
+    def get_key(self, filename, debug):
+        # debug is part of the key as boxes keep it (see Box.contents())
+        st = os.stat(filename)
+        return (
+            CACHE_FORMAT_VERSION,
+            get_library_version(),
+            st.st_dev,
+            st.st_ino,
+            st.st_size,
+            st.st_mtime_ns,
+            debug,
+        )
+
+    def get_entry_path(self, key):
+        name = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, name + CACHE_SUFFIX)
+
+    def load(self, key):
+        """get the (index, boxes) value for a key, or None if not cached
+
+        index is the BoxIndex of the top-level boxes, and boxes maps the
+        position of a top-level box in the index to its pickled data,
+        for the boxes that were small enough to be cached (see
+        load_box()).
+        """
+        entry_path = self.get_entry_path(key)
+        try:
+            with open(entry_path, "rb") as fin:
+                entry = pickle.load(fin)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # broken entry (e.g. unpickling an old class layout)
+            self.remove(entry_path)
+            return None
+        if entry.get("version") != CACHE_FORMAT_VERSION or entry.get("key") != key:
+            self.remove(entry_path)
+            return None
+        # mark the entry as recently used
+        os.utime(entry_path)
+        return entry["index"], entry["boxes"]
+
+    def store(self, key, box_list, debug=0):
+        """store the top-level boxes of a file
+
+        Returns False if the entry is too large to be stored.
+        """
+        index = BoxIndex()
+        boxes = {}
+        for idx, box in enumerate(box_list):
+            # the index keeps the 4-byte box type (extended types are
+            # "uuid")
+            box_type = box.box_type if len(box.box_type) == 4 else b"uuid"
+            header_size = box.payload_offset - box.offset
+            index.append(box.offset, header_size, box.get_size(), box_type, 0, -1)
+            data = dump_box(box)
+            if len(data) > self.max_box_size:
+                if debug > 0:
+                    print(
+                        f"warning: cache: not caching box {box.path} "
+                        f"({len(data)} bytes > {self.max_box_size})"
+                    )
+                continue
+            boxes[idx] = data
+        entry = {
+            "version": CACHE_FORMAT_VERSION,
+            "key": key,
+            "index": index,
+            "boxes": boxes,
+        }
+        data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_entry_size:
+            if debug > 0:
+                print(
+                    f"warning: cache: not caching entry "
+                    f"({len(data)} bytes > {self.max_entry_size})"
+                )
+            return False
+        # write atomically, so concurrent readers never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fout:
+                fout.write(data)
+            os.replace(tmp_path, self.get_entry_path(key))
+        except BaseException:
+            self.remove(tmp_path)
+            raise
+        self.evict()
+        return True
+
+    def evict(self):
+        """remove the least recently used entries over max_size"""
+        entries = []
+        total_size = 0
+        with os.scandir(self.cache_dir) as it:
+            for dir_entry in it:
+                if not dir_entry.name.endswith(CACHE_SUFFIX):
+                    continue
+                try:
+                    st = dir_entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, dir_entry.path))
+                total_size += st.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            self.remove(path)
+            total_size -= size
+
+    def clear(self):
+        with os.scandir(self.cache_dir) as it:
+            for dir_entry in it:
+                if dir_entry.name.endswith(CACHE_SUFFIX):
+                    self.remove(dir_entry.path)
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def dump_box(box):
+    """pickle a box tree, without its root"""
+    # the root (e.g. the MediaFile) holds the PathIndex shared by all the
+    # boxes of a file, so pickling it along a box would pickle all the
+    # other boxes too
+    root = box.root
+    set_root(box, None)
+    try:
+        return pickle.dumps(box, protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        set_root(box, root)
+
+
+def load_box(data, root):
+    """unpickle a box tree, and add it to the PathIndex of root"""
+    box = pickle.loads(data)
+    set_root(box, root)
+    root.path_index.add_tree(box)
+    return box
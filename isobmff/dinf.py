@@ -34,8 +34,10 @@ class DataReferenceBox(FullBox):
         entry_count = read_uint(file, 4)
         self.data_entry = []
         for _ in range(entry_count):
+            if file.tell() >= self.max_offset:
+                break
             # only DataEntryBaseBox boxes here
-            self.data_entry = self.read_box_list(file)
+            self.data_entry.append(self.read_box(file))
 
     def contents(self):
         tuples = super().contents()
@@ -4,6 +4,7 @@ from .box import Box
 
 # ISO/IEC 14496-12:2022, Section 8.1.2
 class FreeBox(Box):
+    __slots__ = ("bytes",)
     box_type = b"free"
     is_mandatory = False
 
@@ -13,10 +14,11 @@ class FreeBox(Box):
     def contents(self):
         tuples = super().contents()
         if self.debug > 2:
-            tuples += (("bytes", f"{self.bytes}"),)
+            tuples += (("bytes", self.bytes),)
         return tuples
 
 
 # ISO/IEC 14496-12:2022, Section 8.1.2
 class SkipBox(FreeBox):
+    __slots__ = ()
     box_type = b"skip"
@@ -13,7 +13,7 @@ class GeneralTypeBox(Box):
     def read(self, file):
         self.major_brand = read_fourcc(file)
         self.minor_version = read_uint(file, 4)
-        num_compatible_brands = int((self.size - 16) / 4)
+        num_compatible_brands = (self.max_offset - file.tell()) // 4
         self.compatible_brands = []
         for _ in range(num_compatible_brands):
             compat_brand = read_fourcc(file)
@@ -30,6 +30,7 @@ class GeneralTypeBox(Box):
 
 # ISO/IEC 14496-12:2022, Section 4.3.2
 class FileTypeBox(Box):
+    __slots__ = ()
     box_type = b"ftyp"
 
 
@@ -45,4 +46,5 @@ class BrandProperty(Box):
 
 # ISO/IEC 14496-12:2022, Section 8.16.2
 class SegmentTypeBox(FileTypeBox):
+    __slots__ = ()
     box_type = b"styp"
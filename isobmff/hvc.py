@@ -2,6 +2,7 @@
 from .box import Box
 from .box import Quantity
 from .box import read_uint
+from .box import read_bytes
 from .stbl import VisualSampleEntry
 
 
@@ -107,7 +108,7 @@ class HEVCDecoderConfigurationRecord:
         item["nal_units"] = []
         for _ in range(num_nalus):
             nal_unit_len = read_uint(file, 2)
-            nal_unit = file.read(nal_unit_len)
+            nal_unit = read_bytes(file, nal_unit_len)
             item["nal_units"].append(nal_unit)
         return item
 
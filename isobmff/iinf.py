@@ -32,6 +32,16 @@ class ItemInformationBox(FullBox):
 
 # ISO/IEC 14496-12:2022, Section 8.11.6.2
 class ItemInformationEntry(FullBox):
+    __slots__ = (
+        "item_id",
+        "item_protection_index",
+        "item_name",
+        "content_type",
+        "content_encoding",
+        "item_info_extension",
+        "item_type",
+        "uri_type",
+    )
     box_type = b"infe"
 
     def read(self, file):
@@ -120,12 +130,30 @@ class FDItemInfoExtension:
 
 
 # ISO/IEC 14496-12:2022, Section 8.11.11
-class ItemDataBox(FullBox):
+class ItemDataBox(Box):
     box_type = b"idat"
 
+    def read(self, file):
+        # the data is not copied: it spans from payload_offset to
+        # max_offset, and ItemReader reads the extents it needs. It is
+        # only kept for printing
+        if self.debug > 2:
+            self.data = self.read_as_bytes(file)
+        else:
+            file.seek(self.max_offset)
 
-# ISO/IEC 14496-12:2022, Section 8.11.11
+    def contents(self):
+        tuples = super().contents()
+        if self.debug > 2:
+            tuples += (("data", self.data),)
+        return tuples
+
+
+# ISO/IEC 14496-12:2022, Section 8.11.12
 class SingleItemTypeReferenceBox(Box):
+    # the box type is the reference type (e.g. "thmb")
+    __slots__ = ("box_type", "from_item_ID", "to_item_IDs")
+
     def read(self, file):
         self.from_item_ID = read_uint(file, 2)
         reference_count = read_uint(file, 2)
@@ -136,13 +164,15 @@ class SingleItemTypeReferenceBox(Box):
     def contents(self):
         tuples = super().contents()
         tuples += (("from_item_ID", self.from_item_ID),)
-        for idx, val in enumerate(self.group_ids):
+        for idx, val in enumerate(self.to_item_IDs):
             tuples += ((f"to_item_ID[{idx}]", val),)
         return tuples
 
 
-# ISO/IEC 14496-12:2022, Section 8.11.11
+# ISO/IEC 14496-12:2022, Section 8.11.12
 class SingleItemTypeReferenceBoxLarge(Box):
+    __slots__ = ("box_type", "from_item_ID", "to_item_IDs")
+
     def read(self, file):
         self.from_item_ID = read_uint(file, 4)
         reference_count = read_uint(file, 2)
@@ -153,22 +183,28 @@ class SingleItemTypeReferenceBoxLarge(Box):
     def contents(self):
         tuples = super().contents()
         tuples += (("from_item_ID", self.from_item_ID),)
-        for idx, val in enumerate(self.group_ids):
+        for idx, val in enumerate(self.to_item_IDs):
             tuples += ((f"to_item_ID[{idx}]", val),)
         return tuples
 
 
-# ISO/IEC 14496-12:2022, Section 8.11.11
+# ISO/IEC 14496-12:2022, Section 8.11.12
 class ItemReferenceBox(FullBox):
     box_type = b"iref"
 
     def read(self, file):
-        if self.version == 0:
-            # TODO: must be SingleItemTypeReferenceBox[]
-            self.box_list = self.read_box_list(file)
-        elif self.version == 1:
-            # TODO: must be SingleItemTypeReferenceBoxLarge[]
-            self.box_list = self.read_box_list(file)
+        # the box type of each entry is its reference type (e.g. "thmb")
+        box_class = (
+            SingleItemTypeReferenceBox
+            if self.version == 0
+            else SingleItemTypeReferenceBoxLarge
+        )
+        self.box_list = []
+        while file.tell() < self.max_offset:
+            box = self.read_box(file, box_class)
+            if box is None:
+                break
+            self.box_list.append(box)
 
     def contents(self):
         tuples = super().contents()
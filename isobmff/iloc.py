@@ -43,7 +43,7 @@ class ItemLocationBox(FullBox):
             for _ in range(extent_count):
                 extent = {}
                 if self.version in [1, 2] and self.index_size > 0:
-                    item["item_reference_index"] = read_uint(file, self.index_size)
+                    extent["item_reference_index"] = read_uint(file, self.index_size)
 
                 if self.offset_size == 0:
                     extent["extent_offset"] = 0
@@ -107,9 +107,9 @@ class ColorInformation(Box):
             tuples += (("transfer_characteristics", self.transfer_characteristics),)
             tuples += (("matrix_coefficients", self.matrix_coefficients),)
         elif self.colour_type == "rICC":
-            tuples += (("ICC_profile", f"{self.ICC_profile}"),)
+            tuples += (("ICC_profile", self.ICC_profile),)
         elif self.colour_type == "prof":
-            tuples += (("ICC_profile", f"{self.ICC_profile}"),)
+            tuples += (("ICC_profile", self.ICC_profile),)
         return tuples
 
 
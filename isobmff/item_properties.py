@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from .box import find_child
+
+
+# ISO/IEC 23008-12:2022, Section 6.5.8, and ISO/IEC 23002-4
+AUX_TYPES_ALPHA = (
+    "urn:mpeg:mpegB:cicp:systems:auxiliary:alpha",
+    "urn:mpeg:hevc:2015:auxid:1",
+)
+AUX_TYPES_DEPTH = (
+    "urn:mpeg:mpegB:cicp:systems:auxiliary:depth",
+    "urn:mpeg:hevc:2015:auxid:2",
+)
+
+
+class ItemProperties:
+    """Item property lookup tables of a "meta" box.
+
+    Built once from the "ipco" and "ipma" boxes, so the properties of an
+    item are dictionary lookups, instead of walks over the association
+    entries:
+
+    * associations: maps the item ID to its (property, essential)
+      tuples, in association order
+    * types: maps the item ID to a dict from the property box type to
+      its (property, essential) tuples
+    * items: maps the property box type to the IDs of the items that
+      have it, in association order
+    """
+
+    def __init__(self, meta):
+        self.associations = {}
+        self.types = {}
+        self.items = {}
+        iprp = find_child(meta, b"iprp")
+        if iprp is None:
+            return
+        # property_index is 1-based (0 means no property)
+        properties = iprp.property_container.properties
+        for ipma in iprp.association:
+            if ipma.box_type != b"ipma":
+                continue
+            for entry in ipma.entries:
+                item_id = entry["item_id"]
+                associations = self.associations.setdefault(item_id, [])
+                types = self.types.setdefault(item_id, {})
+                for association in entry["associations"]:
+                    property_index = association["property_index"]
+                    if not 0 < property_index <= len(properties):
+                        continue
+                    prop = properties[property_index - 1]
+                    value = (prop, association["essential"] == 1)
+                    associations.append(value)
+                    if prop.box_type not in types:
+                        self.items.setdefault(prop.box_type, []).append(item_id)
+                    types.setdefault(prop.box_type, []).append(value)
+
+    def get_properties(self, item_id):
+        """get the (property, essential) tuples of an item"""
+        return self.associations.get(item_id, [])
+
+    def get_property(self, item_id, box_type):
+        """get the first property of an item with the given box type"""
+        values = self.types.get(item_id, {}).get(box_type)
+        return values[0][0] if values else None
+
+    def is_essential(self, item_id, box_type):
+        values = self.types.get(item_id, {}).get(box_type)
+        return any(essential for _, essential in values) if values else False
+
+    def get_items(self, box_type):
+        """get the IDs of the items with a property of the given box type"""
+        return self.items.get(box_type, [])
+
+    def get_image_size(self, item_id):
+        """get (width, height) of an item, from its "ispe" property"""
+        ispe = self.get_property(item_id, b"ispe")
+        return (ispe.width, ispe.height) if ispe is not None else None
+
+    def get_aux_type(self, item_id):
+        """get the aux_type of an item, from its "auxC" property"""
+        auxc = self.get_property(item_id, b"auxC")
+        return auxc.aux_type.rstrip("\0") if auxc is not None else None
+
+    def get_items_by_aux_type(self, aux_types):
+        """get the IDs of the items whose aux_type is in aux_types (e.g.
+        AUX_TYPES_DEPTH)"""
+        return [
+            item_id
+            for item_id in self.get_items(b"auxC")
+            if self.get_aux_type(item_id) in aux_types
+        ]
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+
+from .box import find_child
+
+
+# size of the chunks used to copy item data into files
+ITEM_COPY_CHUNK_SIZE = 1024 * 1024
+
+# self-contained flag of the "url " and "urn " data entries
+DATA_ENTRY_SELF_CONTAINED_FLAG = 0x000001
+
+# URL scheme prefix (RFC 3986, Section 3.1)
+URL_SCHEME_RE = re.compile(r"^[A-Za-z][A-Za-z0-9+.-]*:")
+
+
+class ItemReader:
+    """Reads item data using the "iloc" box of a "meta" box.
+
+    Item extents are resolved into absolute (filename, offset, length)
+    byte ranges, following the base_offset and all the extents of each
+    item, and its construction_method:
+
+    * 0 (file offset): extents of the file selected by the
+      data_reference_index ("dref" entry, 0 for this file)
+    * 1 (idat offset): extents of the "idat" box of the "meta" box
+    * 2 (item offset): extents of the data of the item referenced by
+      an "iloc" item reference (see "iref")
+
+    Extents with extent_length 0 run to the end of the referenced data.
+    Item data is read straight into a caller-supplied buffer or file,
+    without intermediate copies. bytes_read counts the data read.
+
+    Data in external files ("url " entries that are not self-contained)
+    is only read with allow_external=True, as the location comes from
+    the (possibly untrusted) file. Even then, only relative locations
+    below the directory of the file are accepted.
+    """
+
+    def __init__(self, media_file, meta=None, allow_external=False):
+        self.media_file = media_file
+        self.allow_external = allow_external
+        if meta is None:
+            meta = media_file.find_subbox("/meta")
+        if meta is None:
+            raise Exception(f"error: no meta box in {media_file.filename}")
+        self.meta = meta
+        iloc = find_child(meta, b"iloc")
+        self.locations = {}
+        if iloc is not None:
+            for item in iloc.items:
+                self.locations[item["item_id"]] = item
+        self.idat = find_child(meta, b"idat")
+        dinf = find_child(meta, b"dinf")
+        self.dref = find_child(dinf, b"dref") if dinf is not None else None
+        # "iloc" item references (used by construction_method 2)
+        item_references = meta.get_item_references()
+        self.iloc_references = item_references.references.get(b"iloc", {})
+        self.bytes_read = 0
+        self.files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        for file in self.files.values():
+            file.close()
+        self.files = {}
+
+    def get_item_ids(self):
+        return list(self.locations)
+
+    def get_extents(self, item_id, depth=0):
+        """get the (filename, offset, length) byte ranges of an item"""
+        item = self.locations.get(item_id)
+        if item is None:
+            raise Exception(f"error: no iloc entry for item {item_id}")
+        if depth > len(self.locations):
+            raise Exception(f"error: item {item_id} is constructed from itself")
+        construction_method = item.get("construction_method", 0)
+        # zero-size iloc fields (e.g. base_offset_size 0) are read as ""
+        base_offset = item.get("base_offset") or 0
+        extents = []
+        for extent in item["extents"]:
+            offset = base_offset + (extent.get("extent_offset") or 0)
+            length = extent.get("extent_length") or 0
+            if construction_method == 0:
+                filename = self.get_data_filename(item["data_reference_index"])
+                data_size = os.path.getsize(filename)
+                extents += slice_extents([(filename, 0, data_size)], offset, length)
+            elif construction_method == 1:
+                if self.idat is None:
+                    raise Exception(f"error: item {item_id} needs an idat box")
+                idat_extent = (
+                    self.media_file.filename,
+                    self.idat.payload_offset,
+                    self.idat.max_offset - self.idat.payload_offset,
+                )
+                extents += slice_extents([idat_extent], offset, length)
+            elif construction_method == 2:
+                # item_reference_index is 1-based, and 1 if not present
+                reference_index = extent.get("item_reference_index", 1)
+                to_item_ids = self.iloc_references.get(item_id, [])
+                if not 0 < reference_index <= len(to_item_ids):
+                    raise Exception(
+                        f"error: item {item_id} has no iloc reference "
+                        f"{reference_index}"
+                    )
+                source = self.get_extents(to_item_ids[reference_index - 1], depth + 1)
+                extents += slice_extents(source, offset, length)
+            else:
+                raise Exception(
+                    f"error: item {item_id} has unknown construction_method "
+                    f"{construction_method}"
+                )
+        return extents
+
+    def get_data_entry(self, data_reference_index):
+        """get the "dref" entry of an external data reference, or None
+        if the data is in this file"""
+        if data_reference_index == 0:
+            return None
+        if self.dref is None or data_reference_index > len(self.dref.data_entry):
+            raise Exception(f"error: no dref entry {data_reference_index}")
+        data_entry = self.dref.data_entry[data_reference_index - 1]
+        if (data_entry.flags & DATA_ENTRY_SELF_CONTAINED_FLAG) != 0:
+            return None
+        return data_entry
+
+    def is_external(self, item_id):
+        """check whether the data of an item is in an external file"""
+        item = self.locations.get(item_id)
+        if item is None or item.get("construction_method", 0) != 0:
+            return False
+        return self.get_data_entry(item["data_reference_index"]) is not None
+
+    def get_data_filename(self, data_reference_index):
+        """get the file that holds the data of a "dref" entry"""
+        data_entry = self.get_data_entry(data_reference_index)
+        if data_entry is None:
+            return self.media_file.filename
+        if data_entry.box_type != b"url ":
+            raise Exception(
+                f"error: unsupported dref entry type: {data_entry.box_type}"
+            )
+        location = data_entry.location.rstrip("\0")
+        if not self.allow_external:
+            raise Exception(
+                f"error: item data in external file {location!r} "
+                "(external data is not allowed)"
+            )
+        # only relative paths below the directory of the file: no URLs,
+        # absolute paths, or ".." components
+        components = location.replace("\\", "/").split("/")
+        if (
+            not location
+            or "\0" in location
+            or URL_SCHEME_RE.match(location)
+            or os.path.isabs(location)
+            or location.startswith(("/", "\\"))
+            or ".." in components
+        ):
+            raise Exception(f"error: invalid external data location {location!r}")
+        # relative locations are relative to the file with the dref box
+        return os.path.join(os.path.dirname(self.media_file.filename), location)
+
+    def get_item_size(self, item_id):
+        return sum(length for _, _, length in self.get_extents(item_id))
+
+    def read_item(self, item_id):
+        """get the data of an item, as a bytearray"""
+        data = bytearray(self.get_item_size(item_id))
+        self.read_item_into(item_id, data)
+        return data
+
+    def read_item_into(self, item_id, out):
+        """read the data of an item into out, and return its size
+
+        out is either a writable buffer (e.g. a bytearray) of at least
+        get_item_size() bytes, or a binary file (any object with a
+        write() method), where the data is appended.
+        """
+        extents = self.get_extents(item_id)
+        if hasattr(out, "write"):
+            return self.copy_extents(extents, out)
+        view = memoryview(out).cast("B")
+        position = 0
+        for filename, offset, length in extents:
+            self.read_into(filename, offset, view[position : position + length])
+            position += length
+        return position
+
+    def copy_extents(self, extents, out):
+        mmap = self.media_file.mmap
+        buf = None
+        size = 0
+        for filename, offset, length in extents:
+            if mmap is not None and filename == self.media_file.filename:
+                # zero-copy slices of the file map
+                out.write(memoryview(mmap)[offset : offset + length])
+                self.bytes_read += length
+            else:
+                if buf is None:
+                    buf = memoryview(bytearray(ITEM_COPY_CHUNK_SIZE))
+                end = offset + length
+                while offset < end:
+                    chunk = buf[: min(len(buf), end - offset)]
+                    self.read_into(filename, offset, chunk)
+                    out.write(chunk)
+                    offset += len(chunk)
+            size += length
+        return size
+
+    def read_into(self, filename, offset, view):
+        """fill view with the bytes of filename starting at offset"""
+        mmap = self.media_file.mmap
+        if mmap is not None and filename == self.media_file.filename:
+            view[:] = memoryview(mmap)[offset : offset + len(view)]
+            self.bytes_read += len(view)
+            return
+        file = self.files.get(filename)
+        if file is None:
+            # unbuffered, so readinto() fills view directly
+            file = open(filename, "rb", buffering=0)
+            self.files[filename] = file
+        file.seek(offset)
+        position = 0
+        while position < len(view):
+            count = file.readinto(view[position:])
+            if not count:
+                raise Exception(
+                    f"error: truncated item data in {filename} at "
+                    f"0x{offset + position:08x}"
+                )
+            position += count
+        self.bytes_read += len(view)
+
+
+def slice_extents(extents, offset, length):
+    """get the byte ranges of [offset, offset + length) of the data made
+    of the concatenation of extents (length 0 means the rest of it)"""
+    result = []
+    for filename, extent_offset, extent_length in extents:
+        if offset >= extent_length:
+            offset -= extent_length
+            continue
+        count = extent_length - offset
+        if length != 0:
+            count = min(count, length)
+        result.append((filename, extent_offset + offset, count))
+        offset = 0
+        if length != 0:
+            length -= count
+            if length == 0:
+                return result
+    if length != 0 or (not result and offset != 0):
+        raise Exception("error: item extent beyond the end of its data")
+    return result
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import array
+
+from .box import find_child
+
+
+class ItemReferences:
+    """Item reference graph of a "meta" box.
+
+    Built once from the "iref" box, with one adjacency table per
+    reference type (e.g. b"thmb", b"auxl", b"dimg", b"cdsc"):
+
+    * references: maps the reference type to a dict from the item ID
+      to the array.array of the IDs of the items it references
+    * referenced_by: same, for the reverse edges (from the referenced
+      item to the items that reference it)
+
+    The primary item ID (from "pitm") is kept in primary_item_id.
+    """
+
+    def __init__(self, meta):
+        self.references = {}
+        self.referenced_by = {}
+        pitm = find_child(meta, b"pitm")
+        self.primary_item_id = pitm.item_id if pitm is not None else None
+        iref = find_child(meta, b"iref")
+        if iref is None:
+            return
+        for reference in iref.box_list:
+            forward = self.references.setdefault(reference.box_type, {})
+            to_item_ids = forward.setdefault(reference.from_item_ID, array.array("I"))
+            to_item_ids.extend(reference.to_item_IDs)
+            reverse = self.referenced_by.setdefault(reference.box_type, {})
+            for to_item_id in reference.to_item_IDs:
+                reverse.setdefault(to_item_id, array.array("I")).append(
+                    reference.from_item_ID
+                )
+
+    def get_references(self, item_id, reference_type):
+        """get the IDs of the items referenced by item_id"""
+        return self.references.get(reference_type, {}).get(item_id, ())
+
+    def get_referencing_items(self, item_id, reference_type):
+        """get the IDs of the items that reference item_id"""
+        return self.referenced_by.get(reference_type, {}).get(item_id, ())
+
+    def get_thumbnails(self, item_id=None):
+        """get the thumbnail item IDs of an item (the primary by default)"""
+        if item_id is None:
+            item_id = self.primary_item_id
+        return self.get_referencing_items(item_id, b"thmb")
+
+    def get_auxiliary_items(self, item_id=None, item_properties=None, aux_types=None):
+        """get the auxiliary item IDs (e.g. alpha, depth) of an item
+
+        With item_properties (see ItemProperties), only the auxiliary
+        items whose "auxC" aux_type is in aux_types are returned (e.g.
+        AUX_TYPES_ALPHA).
+        """
+        if item_id is None:
+            item_id = self.primary_item_id
+        aux_item_ids = self.get_referencing_items(item_id, b"auxl")
+        if item_properties is None or aux_types is None:
+            return aux_item_ids
+        return [
+            aux_item_id
+            for aux_item_id in aux_item_ids
+            if item_properties.get_aux_type(aux_item_id) in aux_types
+        ]
+
+    def get_derived_inputs(self, item_id=None):
+        """get the input item IDs of a derived image item (e.g. the tiles
+        of a "grid" item), in reference order"""
+        if item_id is None:
+            item_id = self.primary_item_id
+        return self.get_references(item_id, b"dimg")
+
+    def get_metadata_items(self, item_id=None):
+        """get the IDs of the metadata items (e.g. Exif, XMP) that
+        describe an item"""
+        if item_id is None:
+            item_id = self.primary_item_id
+        return self.get_referencing_items(item_id, b"cdsc")
+
+    def get_smallest_thumbnail(
+        self, item_properties, item_id=None, min_width=0, min_height=0
+    ):
+        """get the ID of the smallest thumbnail of an item (the primary
+        by default) that is at least min_width x min_height, or None
+
+        Thumbnail sizes come from their "ispe" property.
+        """
+        best_item_id = None
+        best_area = None
+        for thumbnail_id in self.get_thumbnails(item_id):
+            size = item_properties.get_image_size(thumbnail_id)
+            if size is None:
+                continue
+            width, height = size
+            if width < min_width or height < min_height:
+                continue
+            if best_area is None or width * height < best_area:
+                best_item_id = thumbnail_id
+                best_area = width * height
+        return best_item_id
@@ -3,8 +3,10 @@ from .box import Box
 
 
 class MediaDataBox(Box):
+    __slots__ = ()
     box_type = b"mdat"
     is_mandatory = False
+    bulk_read = False
 
     def read(self, file):
         # skip the remaining data
@@ -28,6 +28,8 @@ class MediaHeaderBox(FullBox):
     quantity = Quantity.EXACTLY_ONE
 
     def read(self, file):
+        # one box per track: a struct.Struct does not pay off here (see
+        # isobmff-bench.py --bulk)
         read_size = 8 if self.version == 1 else 4
         self.creation_time = read_uint(file, read_size)
         self.modification_time = read_uint(file, read_size)
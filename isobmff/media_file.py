@@ -1,23 +1,77 @@
 # -*- coding: utf-8 -*-
+import mmap
 import os
 
 from .box import Box
-from .box import find_subbox
+from .box import PathIndex
+from .box import iter_subboxes
+from .box_filter import BoxFilter
+from .cache import load_box
+from .parallel import read_parallel
+from .sample_index import FragmentSampleIndex
+from .sample_index import SampleIndex
+from .segment_index import SegmentIndex
+from .buffer_file import BufferFile
 
 
 class MediaFile(Box):
-    def __init__(self, filename, debug):
+    # per-file settings, shared by all the boxes of the file (see
+    # Box.root). Set in __init__() and read()
+    lazy = False
+    bulk = False
+    path_index = None
+    box_filter = None
+
+    def __init__(
+        self,
+        filename,
+        debug,
+        lazy=False,
+        use_mmap=False,
+        bulk=False,
+        cache=None,
+        jobs=1,
+        use_processes=True,
+    ):
         self.filename = filename
         offset = 0
         payload_offset = 0
         path = ""
         size = os.path.getsize(self.filename)
         largesize = None
-        max_offset = None
+        max_offset = size
         super().__init__(
             offset, payload_offset, path, size, largesize, max_offset, debug
         )
         self.debug = debug
+        # in lazy mode, the file stays open until close() is called,
+        # as box payloads are read on access
+        self.lazy = lazy
+        # in mmap mode, boxes are parsed from a memory map of the file,
+        # and raw payloads are zero-copy slices of it. The map stays
+        # open until close() is called
+        self.use_mmap = use_mmap
+        # in bulk mode, each top-level box payload is read with a single
+        # read() call, and parsed from memory
+        self.bulk = bulk
+        # optional BoxCache. Cached box trees are fully decoded, so they
+        # are only stored when parsing in eager (non-lazy, non-mmap) mode.
+        # Bulk mode trees keep memoryview slices, which cannot be pickled
+        self.cache = cache
+        # with jobs > 1, independent top-level boxes (e.g. moof) are
+        # decoded in a pool of jobs worker processes (or threads)
+        self.jobs = jobs
+        self.use_processes = use_processes
+        self.file = None
+        self.mmap = None
+        # path and box type lookup tables, filled in by read_box()
+        self.path_index = PathIndex()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def contents(self):
         # no super() here as the box header data is false
@@ -26,9 +80,203 @@ class MediaFile(Box):
             tuples += (("box", box.contents()),)
         return tuples
 
-    def read(self):
+    def read(self, include=None, exclude=None, predicate=None):
+        """parse the file
+
+        include, exclude, and predicate select the boxes to read (see
+        BoxFilter). Filtered-out boxes are replaced by SkippedBox
+        placeholders, and their payload is never read.
+        """
+        self.set_filter(include, exclude, predicate)
+        value = None
+        if self.cache is not None and self.box_filter is None:
+            cache_key = self.cache.get_key(self.filename, self.debug)
+            value = self.cache.load(cache_key)
+        if self.use_mmap:
+            self.file = self.open_mmap()
+        elif self.lazy:
+            self.file = open(self.filename, "rb")
+        if value is not None:
+            if self.file is not None:
+                self.box_list = self.read_cached_boxes(self.file, value)
+            else:
+                with open(self.filename, "rb") as file:
+                    self.box_list = self.read_cached_boxes(file, value)
+            return
+        if self.use_mmap:
+            self.box_list = self.read_top_level_boxes(self.file)
+            return
+        if self.lazy:
+            self.box_list = self.read_box_list(self.file)
+            return
+        with open(self.filename, "rb") as file:
+            self.box_list = self.read_top_level_boxes(file)
+        if self.cache is not None and self.box_filter is None and not self.bulk:
+            self.cache.store(cache_key, self.box_list, self.debug)
+
+    def read_cached_boxes(self, file, value):
+        """get the top-level boxes of a cache entry (see BoxCache.load())
+
+        Cached boxes are unpickled, and the other ones are parsed again
+        from file.
+        """
+        index, boxes = value
+        box_list = []
+        for idx in range(len(index)):
+            data = boxes.get(idx)
+            if data is None:
+                file.seek(index.offset[idx])
+                box_list.append(self.read_box(file))
+                continue
+            # reserve the box path, so later boxes get the right one
+            Box.get_path(self.path, index.get_fourcc(idx), self)
+            box_list.append(load_box(data, self))
+        return box_list
+
+    def read_top_level_boxes(self, file):
+        if self.jobs > 1:
+            return read_parallel(self, file, self.jobs, self.use_processes)
+        return self.read_box_list(file)
+
+    def set_filter(self, include=None, exclude=None, predicate=None):
+        if include is None and exclude is None and predicate is None:
+            self.box_filter = None
+        else:
+            self.box_filter = BoxFilter(include, exclude, predicate)
+
+    def iter_boxes(self, depth=0, types=None, keep=False):
+        """parse the file incrementally, yielding boxes as they are read
+
+        Top-level boxes are read one at a time. Each one is yielded right
+        after it is read, followed by its descendants up to depth levels
+        below it (depth=0 only yields top-level boxes). If types is set,
+        only boxes whose box type is in types are yielded.
+
+        By default, each top-level box (and its descendants) is dropped
+        when the next one is read, so memory use is bounded by the largest
+        top-level box, not by the file size. With keep=True, top-level
+        boxes are appended to box_list and indexed (as in read()), and
+        can be dropped with release() once processed. Call set_filter()
+        first to skip unwanted boxes (see read()).
+        """
+        self.box_list = []
+        self.subpath = {}
+        self.path_index = PathIndex()
+        file = self.open_mmap() if self.use_mmap else open(self.filename, "rb")
+        if self.lazy or self.use_mmap:
+            # box payloads may be read after the iteration
+            self.file = file
+        try:
+            while file.tell() < self.max_offset:
+                if not keep:
+                    # only index the current top-level box
+                    self.path_index = PathIndex()
+                box = self.read_box(file)
+                if box is None:
+                    break
+                if keep:
+                    self.box_list.append(box)
+                yield from iter_subboxes(box, depth, types)
+        finally:
+            if self.file is not file:
+                file.close()
+
+    def release(self, box):
+        """drop a top-level box kept by iter_boxes(), and its descendants"""
+        self.box_list.remove(box)
+        self.path_index.remove(box)
+
+    def open_mmap(self):
+        if self.size == 0:
+            # empty files cannot be mapped
+            return BufferFile(b"")
         with open(self.filename, "rb") as file:
-            self.box_list = self.read_box_list(file)
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return BufferFile(self.mmap)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.mmap is not None:
+            try:
+                self.mmap.close()
+            except BufferError:
+                # zero-copy slices are still alive: the map will be
+                # released when they are gone
+                pass
+            self.mmap = None
+
+    def get_bytes(self, offset, size):
+        """get size bytes starting at offset (zero-copy in mmap mode)"""
+        if self.mmap is not None:
+            return memoryview(self.mmap)[offset : offset + size]
+        with open(self.filename, "rb") as file:
+            file.seek(offset)
+            return file.read(size)
 
     def find_subbox(self, full_path):
-        return find_subbox(self, full_path)
+        """get the box at full_path (e.g. "/meta/iprp/ipco/ispe2")"""
+        box = self.path_index.find(full_path)
+        if box is None and self.lazy:
+            # load the ancestors of the box: this indexes their children
+            ancestor_path = ""
+            for name in full_path.strip().split("/")[1:-1]:
+                ancestor_path += "/" + name
+                ancestor = self.path_index.find(ancestor_path)
+                if ancestor is None:
+                    return None
+                ancestor.load()
+            box = self.path_index.find(full_path)
+        return box
+
+    def find_all(self, box_type):
+        """get all the boxes of a given (full) box type, in read order
+
+        In lazy mode, only the boxes that have been loaded are returned.
+        """
+        return self.path_index.find_all(box_type)
+
+    def get_tracks(self):
+        """get the "trak" boxes of the movie, in file order"""
+        for box in self.box_list:
+            if box.box_type == b"moov":
+                box.load()
+                return [child for child in box.box_list if child.box_type == b"trak"]
+        return []
+
+    def get_sample_index(self, track_id):
+        """get the SampleIndex of the track with the given track_id"""
+        for trak in self.get_tracks():
+            sample_index = SampleIndex.from_track(trak)
+            if sample_index.track_id == track_id:
+                return sample_index
+        return None
+
+    def get_sample_indices(self):
+        """get the SampleIndex of every track, in file order"""
+        return [SampleIndex.from_track(trak) for trak in self.get_tracks()]
+
+    def get_fragment_sample_index(self, track_id):
+        """get the FragmentSampleIndex of a track, with all its fragments
+
+        To index a file while it is being read, create the index with
+        FragmentSampleIndex.from_movie(), and call add_fragment() for
+        each "moof" box.
+        """
+        sample_index = None
+        for box in self.box_list:
+            if box.box_type == b"moov":
+                box.load()
+                sample_index = FragmentSampleIndex.from_movie(box, track_id)
+            elif box.box_type == b"moof" and sample_index is not None:
+                sample_index.add_fragment(box)
+        return sample_index
+
+    def get_segment_index(self, reference_id=None):
+        """get the SegmentIndex of a track from its "sidx" boxes
+
+        reference_id selects the track (the first one by default).
+        Returns None if the file has no "sidx" boxes.
+        """
+        return SegmentIndex.from_boxes(self.find_all(b"sidx"), reference_id)
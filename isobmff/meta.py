@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from .box import FullBox
 from .box import Quantity
+from .item_properties import ItemProperties
+from .item_references import ItemReferences
 
 
 # ISO/IEC 14496-12:2022, Section 8.11.1.1
@@ -10,6 +12,10 @@ class MetaBox(FullBox):
     box_type = b"meta"
     is_mandatory = False
     quantity = Quantity.ZERO_OR_ONE
+    # lookup tables, built on first use (see get_item_properties() and
+    # get_item_references())
+    item_properties = None
+    item_references = None
 
     def read(self, file):
         self.box_list = []
@@ -35,6 +41,18 @@ class MetaBox(FullBox):
                 break
             self.box_list.append(box)
 
+    def get_item_properties(self):
+        """get the ItemProperties of the box (built once)"""
+        if self.item_properties is None:
+            self.item_properties = ItemProperties(self)
+        return self.item_properties
+
+    def get_item_references(self):
+        """get the ItemReferences of the box (built once)"""
+        if self.item_references is None:
+            self.item_references = ItemReferences(self)
+        return self.item_references
+
     def contents(self):
         tuples = super().contents()
         for idx, box in enumerate(self.box_list):
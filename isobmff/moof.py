@@ -7,6 +7,7 @@ from .box import read_uint
 
 # ISO/IEC 14496-12:2022, Section 8.8.4
 class MovieFragmentBox(Box):
+    __slots__ = ("box_list",)
     box_type = b"moof"
 
     def read(self, file):
@@ -24,6 +25,7 @@ class MovieFragmentBox(Box):
 
 # ISO/IEC 14496-12:2022, Section 8.8.5
 class MovieFragmentHeaderBox(FullBox):
+    __slots__ = ("sequence_number",)
     box_type = b"mfhd"
 
     def read(self, file):
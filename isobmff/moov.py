@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
+import struct
+
 from .box import Box
 from .box import FullBox
 from .box import Quantity
-from .box import read_uint
+from .box import read_struct
 
 
 # ISO/IEC 14496-12:2022, Section 8.2.1
@@ -26,26 +28,25 @@ class MovieHeaderBox(FullBox):
     box_type = b"mvhd"
     is_mandatory = True
     quantity = Quantity.EXACTLY_ONE
+    # fixed-layout fields, per version
+    FIELDS = {
+        0: struct.Struct(">IIII IHH 2I 9I 6I I"),
+        1: struct.Struct(">QQIQ IHH 2I 9I 6I I"),
+    }
 
     def read(self, file):
-        read_size = 8 if self.version == 1 else 4
-        self.creation_time = read_uint(file, read_size)
-        self.modification_time = read_uint(file, read_size)
-        self.timescale = read_uint(file, 4)
-        self.duration = read_uint(file, read_size)
-        self.rate = read_uint(file, 4)
-        self.volume = read_uint(file, 2)
-        self.reserved1 = read_uint(file, 2)
-        self.reserved2 = []
-        for _ in range(2):
-            self.reserved2.append(read_uint(file, 4))
-        self.matrix = []
-        for _ in range(9):
-            self.matrix.append(read_uint(file, 4))
-        self.pre_defined = []
-        for _ in range(6):
-            self.pre_defined.append(read_uint(file, 4))
-        self.next_track_id = read_uint(file, 4)
+        values = read_struct(file, self.FIELDS[1 if self.version == 1 else 0])
+        self.creation_time = values[0]
+        self.modification_time = values[1]
+        self.timescale = values[2]
+        self.duration = values[3]
+        self.rate = values[4]
+        self.volume = values[5]
+        self.reserved1 = values[6]
+        self.reserved2 = list(values[7:9])
+        self.matrix = list(values[9:18])
+        self.pre_defined = list(values[18:24])
+        self.next_track_id = values[24]
 
     def contents(self):
         tuples = super().contents()
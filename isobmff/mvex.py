@@ -41,6 +41,8 @@ class TrackExtendsBox(FullBox):
     box_type = b"trex"
 
     def read(self, file):
+        # one box per track: a struct.Struct does not pay off here (see
+        # isobmff-bench.py --bulk)
         self.track_ID = read_uint(file, 4)
         self.default_sample_description_index = read_uint(file, 4)
         self.default_sample_duration = read_uint(file, 4)
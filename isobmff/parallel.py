@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+import concurrent.futures
+import os
+import pickle
+
+from .box import Box
+from .box import PathIndex
+from .box import decode_posix_portable_filename
+from .box import read_box
+from .box import set_root
+from .buffer_file import BufferFile
+from .scan import scan
+
+
+# independent top-level boxes, decoded by the worker pool
+PARALLEL_BOX_TYPES = (b"moof", b"sidx", b"emsg")
+
+# number of boxes per worker task
+PARALLEL_BATCH_SIZE = 32
+
+# files with fewer independent top-level boxes are read serially. A
+# serial "moof" decode takes ~0.16 ms, and sending it back from a worker
+# process costs ~0.06 ms in the calling process, so even with many
+# cores the pool start-up needs several hundred boxes to pay off
+PARALLEL_MIN_BOXES = 1000
+
+
+def read_boxes_at(filename, batch, debug, box_filter=None):
+    """read a batch of top-level boxes using positional reads
+
+    batch is a list of (idx, offset, size, count) tuples, where count
+    is the number of top-level boxes of the same type up to this one
+    (it numbers the box path, see Box.get_path()).
+
+    Returns a list of (idx, box) tuples. The boxes have no root (see
+    Box.root): the caller sets it.
+    """
+    # media_file imports this module
+    from .media_file import MediaFile
+
+    result = []
+    # parent of the boxes: it gives them their path, and holds the box
+    # filter. The boxes are not indexed here
+    parent = MediaFile(filename, debug)
+    parent.path_index = None
+    parent.box_filter = box_filter
+    fd = os.open(filename, os.O_RDONLY)
+    try:
+        for idx, offset, size, count in batch:
+            data = os.pread(fd, size, offset)
+            file = BufferFile(data, offset)
+            parent.subpath = None
+            if count > 1:
+                box_type_str = decode_posix_portable_filename(bytes(data[4:8]))
+                parent.subpath = {box_type_str: count}
+            box = read_box(file, parent.path, debug, parent, offset + size)
+            set_root(box, None)
+            result.append((idx, box))
+    finally:
+        os.close(fd)
+    return result
+
+
+def read_parallel(
+    media_file, file, jobs, use_processes=True, min_boxes=PARALLEL_MIN_BOXES
+):
+    """read the top-level boxes of a file, decoding independent ones
+    (see PARALLEL_BOX_TYPES) in a pool of jobs workers
+
+    The top-level box headers are found with a header scan. The other
+    top-level boxes (e.g. ftyp, moov, mdat) are read from file in the
+    calling thread, while the workers decode the independent ones.
+    Results are merged in file order, and indexed in the same order as
+    a serial read. Files with less than min_boxes independent boxes are
+    read serially.
+
+    With use_processes, the box filter is pickled to be sent to the
+    workers, so its predicate must be a module-level function (not a
+    lambda or a closure). Use threads (use_processes=False) otherwise.
+    """
+    if use_processes and media_file.box_filter is not None:
+        try:
+            pickle.dumps(media_file.box_filter)
+        except (pickle.PicklingError, AttributeError, TypeError) as exc:
+            raise Exception(
+                "error: the box filter cannot be sent to worker processes "
+                f"({exc}): use a module-level predicate function, or "
+                "use_processes=False"
+            ) from exc
+    index = scan(media_file.filename, containers=())
+    num_boxes = sum(1 for entry in index if entry[3] in PARALLEL_BOX_TYPES)
+    if num_boxes < min_boxes:
+        # not worth starting a pool
+        return media_file.read_box_list(file)
+    box_list = [None] * len(index)
+    parallel_idx = []
+    executor_class = (
+        concurrent.futures.ProcessPoolExecutor
+        if use_processes
+        else concurrent.futures.ThreadPoolExecutor
+    )
+    with executor_class(jobs) as executor:
+        futures = []
+        batch = []
+        for idx, (offset, _, size, box_type, _, _) in enumerate(index):
+            if box_type not in PARALLEL_BOX_TYPES:
+                file.seek(offset)
+                box_list[idx] = media_file.read_box(file)
+                continue
+            # a truncated last box ends at the end of the file (see
+            # read_box())
+            size = min(size, media_file.max_offset - offset)
+            # reserve the box path, so later boxes get the right one
+            box_type_str = decode_posix_portable_filename(box_type)
+            count = (media_file.subpath or {}).get(box_type_str, 1)
+            Box.get_path(media_file.path, box_type, media_file)
+            batch.append((idx, offset, size, count))
+            parallel_idx.append(idx)
+            if len(batch) == PARALLEL_BATCH_SIZE:
+                futures.append(
+                    executor.submit(
+                        read_boxes_at,
+                        media_file.filename,
+                        batch,
+                        media_file.debug,
+                        media_file.box_filter,
+                    )
+                )
+                batch = []
+        if batch:
+            futures.append(
+                executor.submit(
+                    read_boxes_at,
+                    media_file.filename,
+                    batch,
+                    media_file.debug,
+                    media_file.box_filter,
+                )
+            )
+        for future in futures:
+            for idx, box in future.result():
+                box_list[idx] = box
+    for idx in parallel_idx:
+        set_root(box_list[idx], media_file)
+    # index all the boxes in file order, as a serial read does (the
+    # ones read in this thread were indexed before the worker ones)
+    media_file.path_index = PathIndex()
+    for box in box_list:
+        media_file.path_index.add_tree(box)
+    return box_list
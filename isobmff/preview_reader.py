@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+import os
+
+from .box import read_box
+from .buffer_file import BufferFile
+from .item_reader import ItemReader
+from .media_file import MediaFile
+from .scan import read_box_header
+
+
+# bytes read at once at the start of the file. It holds the "ftyp" and
+# "meta" boxes (and often the data of the small items) of most HEIF
+# files
+PREVIEW_HEAD_SIZE = 64 * 1024
+
+# largest box header (size, type, largesize, and extended type fields)
+MAX_BOX_HEADER_SIZE = 32
+
+
+class PreviewReader:
+    """Reads a preview image of a HEIF file with bounded I/O.
+
+    Only the top-level "ftyp" and "meta" boxes are parsed, from memory:
+    the first head_size bytes of the file are read at once, and the rest
+    of the "meta" box (if any) with a single extra read. Top-level boxes
+    before "meta" that do not fit in the head (e.g. a large "mdat") are
+    skipped reading only their header.
+
+    The preview item (the primary item, or its smallest thumbnail, see
+    get_preview_item_id()) is resolved using the "pitm", "iref", and
+    "iloc" boxes, and only its extents are read (adjacent extents with
+    a single read). Data already read (e.g. "idat") is not read again.
+
+    bytes_read and read_count count the I/O done so far. With max_bytes,
+    a read that would take bytes_read over it raises an exception
+    before doing any I/O. Item data in external files is only read with
+    allow_external=True (see ItemReader).
+    """
+
+    def __init__(
+        self,
+        filename,
+        debug=0,
+        head_size=PREVIEW_HEAD_SIZE,
+        max_bytes=None,
+        allow_external=False,
+    ):
+        # the media file is never read(): its box list is filled here
+        self.media_file = MediaFile(filename, debug)
+        self.media_file.box_list = []
+        self.filename = filename
+        self.debug = debug
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.read_count = 0
+        self.fd = os.open(filename, os.O_RDONLY)
+        try:
+            self.read_meta(head_size)
+            self.item_reader = ItemReader(
+                self.media_file, self.meta, allow_external
+            )
+            self.item_references = self.meta.get_item_references()
+            self.item_properties = self.meta.get_item_properties()
+        except BaseException:
+            # no close() yet: the caller never gets the object
+            os.close(self.fd)
+            self.fd = None
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        self.item_reader.close()
+
+    def read_meta(self, head_size):
+        self.size = os.fstat(self.fd).st_size
+        # bytes read so far, as (offset, data) ranges. The first one is
+        # the head of the file
+        self.ranges = []
+        if self.max_bytes is not None:
+            head_size = min(head_size, self.max_bytes)
+        self.head = self.read_bytes(0, min(head_size, self.size))
+        self.ranges.append((0, self.head))
+        self.meta = None
+        self.read_top_level_boxes()
+        if self.meta is None:
+            raise Exception(f"error: no meta box in {self.filename}")
+
+    def read_top_level_boxes(self):
+        """parse the top-level boxes up to (and including) "meta"
+
+        Only "ftyp" and "meta" are parsed: other boxes are skipped.
+        """
+        offset = 0
+        while offset < self.size and self.meta is None:
+            header = BufferFile(self.get_range(offset, MAX_BOX_HEADER_SIZE), offset)
+            box_header = read_box_header(header, self.size)
+            if box_header is None:
+                break
+            size, _, box_type = box_header
+            if box_type in (b"ftyp", b"meta"):
+                buf = BufferFile(self.get_range(offset, size), offset)
+                box = read_box(
+                    buf, self.media_file.path, self.debug, self.media_file, self.size
+                )
+                self.media_file.box_list.append(box)
+                if box_type == b"meta":
+                    self.meta = box
+            offset += size
+
+    def get_range(self, offset, size):
+        """get the bytes in [offset, offset + size) (less at the end of
+        the file), reading only the ones that were not read yet"""
+        size = min(size, self.size - offset)
+        head_end = len(self.head)
+        if offset <= head_end < offset + size:
+            # extend the head (e.g. a "meta" box larger than head_size).
+            # Parsed boxes keep views of the old one, so it is replaced
+            self.head = self.head + self.read_bytes(head_end, offset + size - head_end)
+            self.ranges[0] = (0, self.head)
+        for range_offset, data in self.ranges:
+            if range_offset <= offset and offset + size <= range_offset + len(data):
+                start = offset - range_offset
+                return memoryview(data)[start : start + size]
+        data = self.read_bytes(offset, size)
+        self.ranges.append((offset, data))
+        return memoryview(data)
+
+    def check_max_bytes(self, offset, size):
+        if self.max_bytes is not None and self.bytes_read + size > self.max_bytes:
+            raise Exception(
+                f"error: reading {size} bytes at 0x{offset:08x} goes over the "
+                f"{self.max_bytes} bytes limit"
+            )
+
+    def read_bytes(self, offset, size):
+        self.check_max_bytes(offset, size)
+        data = os.pread(self.fd, size, offset)
+        if len(data) < size:
+            raise Exception(f"error: truncated file at 0x{offset + len(data):08x}")
+        self.bytes_read += size
+        self.read_count += 1
+        return data
+
+    def get_preview_item_id(self, min_width=0, min_height=0):
+        """get the ID of the smallest thumbnail of the primary item that
+        is at least min_width x min_height, or of the primary item if
+        there is none"""
+        thumbnail_id = self.item_references.get_smallest_thumbnail(
+            self.item_properties, min_width=min_width, min_height=min_height
+        )
+        if thumbnail_id is not None:
+            return thumbnail_id
+        if self.item_references.primary_item_id is None:
+            raise Exception(f"error: no primary item in {self.filename}")
+        return self.item_references.primary_item_id
+
+    def get_image_item_ids(self, item_id):
+        """get the IDs of the items needed to decode an image item: the
+        item itself, followed by its derived image inputs (e.g. the
+        tiles of a "grid" item), recursively"""
+        item_ids = [item_id]
+        # item_ids grows while it is walked
+        for derived_item_id in item_ids:
+            for input_item_id in self.item_references.get_derived_inputs(
+                derived_item_id
+            ):
+                if input_item_id not in item_ids:
+                    item_ids.append(input_item_id)
+        return item_ids
+
+    def read_items(self, item_ids):
+        """get a dict mapping each item ID to its data (as bytes)
+
+        Extents of all the items are fetched together, merging the
+        adjacent ones.
+        """
+        extents = {
+            item_id: self.item_reader.get_extents(item_id) for item_id in item_ids
+        }
+        self.prefetch(
+            [
+                (offset, length)
+                for item_extents in extents.values()
+                for filename, offset, length in item_extents
+                if filename == self.filename
+            ]
+        )
+        items = {}
+        for item_id, item_extents in extents.items():
+            data = bytearray()
+            for filename, offset, length in item_extents:
+                if filename == self.filename:
+                    data += self.get_range(offset, length)
+                else:
+                    # external data ("dref" entries)
+                    self.check_max_bytes(offset, length)
+                    view = memoryview(bytearray(length))
+                    self.item_reader.read_into(filename, offset, view)
+                    self.bytes_read += length
+                    self.read_count += 1
+                    data += view
+            items[item_id] = bytes(data)
+        return items
+
+    def prefetch(self, extents):
+        """read the (offset, length) extents that were not read yet,
+        merging the adjacent (or overlapping) ones"""
+        run_start = run_end = None
+        for offset, length in sorted(extents):
+            if run_end is not None and offset <= run_end:
+                run_end = max(run_end, offset + length)
+                continue
+            if run_end is not None:
+                self.get_range(run_start, run_end - run_start)
+            run_start, run_end = offset, offset + length
+        if run_end is not None:
+            self.get_range(run_start, run_end - run_start)
+
+    def read_preview(self, min_width=0, min_height=0):
+        """get (item_id, items) for the preview image, where items maps
+        the IDs of the items needed to decode it to their data"""
+        item_id = self.get_preview_item_id(min_width, min_height)
+        return item_id, self.read_items(self.get_image_item_ids(item_id))
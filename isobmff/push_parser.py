@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+from .box import Box
+from .box import read_box
+from .buffer_file import BufferFile
+
+
+# boxes whose payload is passed through instead of being buffered
+PUSH_SKIP_BOX_TYPES = (b"mdat",)
+
+
+# largest box header: size, type, largesize, and extended type fields
+MAX_HEADER_SIZE = 32
+
+
+def parse_box_header(buf, offset):
+    """parse the box header at the start of buf
+
+    Returns a (size, header_size, box_type) tuple, or None if buf is too
+    short. size is 0 for boxes that extend to the end of the stream.
+    """
+    if len(buf) < 8:
+        return None
+    size = int.from_bytes(buf[0:4], byteorder="big")
+    box_type = bytes(buf[4:8])
+    header_size = 16 if size == 1 else 8
+    if box_type == b"uuid":
+        header_size += 16
+    if len(buf) < header_size:
+        return None
+    if size == 1:
+        size = int.from_bytes(buf[8:16], byteorder="big")
+    if size != 0 and size < header_size:
+        raise Exception(
+            f"error: invalid box size {size} type: {box_type} at 0x{offset:08x}"
+        )
+    return size, header_size, box_type
+
+
+class PushParser:
+    """Incremental parser for non-seekable streams (pipes, sockets, etc.).
+
+    Data is pushed in chunks of any size with feed(), which returns the
+    top-level boxes completed by the chunk. Top-level boxes are buffered
+    until complete, and then parsed from memory with the regular box
+    classes, so their read() methods can still seek.
+
+    The payload of the boxes in skip_types (mdat by default) is never
+    buffered: the box is returned as soon as its header is complete,
+    and its payload is passed to data_callback(box, offset, data) as it
+    arrives. data is a memoryview, only valid during the call.
+
+    Call close() at the end of the stream.
+    """
+
+    def __init__(self, debug=0, data_callback=None, skip_types=PUSH_SKIP_BOX_TYPES):
+        self.debug = debug
+        self.data_callback = data_callback
+        self.skip_types = skip_types
+        # parent of the top-level boxes (it numbers their paths)
+        self.root = Box(0, 0, "", 0, None, None, debug)
+        self.buf = bytearray()
+        # stream offset of the first byte of buf
+        self.offset = 0
+        # box whose payload is being passed through, and end of it
+        # (None for size=0 boxes, which extend to the end of the stream)
+        self.skipped_box = None
+        self.skip_end = None
+
+    def feed(self, data):
+        """push a chunk of data, and get the top-level boxes it completes"""
+        box_list = []
+        data = memoryview(data).cast("B")
+        while len(data) > 0:
+            if self.skipped_box is not None:
+                data = self.skip_payload(data)
+                continue
+            self.buf += data
+            data = data[:0]
+            while self.skipped_box is None:
+                box = self.parse_box()
+                if box is None:
+                    break
+                box_list.append(box)
+            if self.skipped_box is not None and self.buf:
+                # the rest of the buffer belongs to the skipped payload
+                data = memoryview(bytes(self.buf))
+                self.buf.clear()
+        return box_list
+
+    def skip_payload(self, data):
+        length = len(data)
+        if self.skip_end is not None:
+            length = min(length, self.skip_end - self.offset)
+        if self.data_callback is not None:
+            self.data_callback(self.skipped_box, self.offset, data[:length])
+        self.offset += length
+        if self.offset == self.skip_end:
+            self.skipped_box = None
+            self.skip_end = None
+        return data[length:]
+
+    def parse_box(self):
+        """parse the box at the start of the buffer (None if incomplete)"""
+        header = parse_box_header(self.buf, self.offset)
+        if header is None:
+            return None
+        size, header_size, box_type = header
+        if box_type in self.skip_types:
+            self.skip_end = None if size == 0 else self.offset + size
+            box = self.read_box(header_size, self.skip_end)
+            self.skipped_box = box
+            self.offset += header_size
+            del self.buf[:header_size]
+            if self.skip_end == self.offset:
+                # empty payload
+                self.skipped_box = None
+                self.skip_end = None
+            return box
+        if size == 0 or len(self.buf) < size:
+            # size=0 boxes are only complete at the end of the stream
+            return None
+        box = self.read_box(size, self.offset + size)
+        self.offset += size
+        del self.buf[:size]
+        return box
+
+    def read_box(self, length, max_offset):
+        # copy the box bytes, so boxes may keep zero-copy slices of them
+        file = BufferFile(bytes(self.buf[:length]), self.offset)
+        return read_box(file, self.root.path, self.debug, self.root, max_offset)
+
+    def close(self):
+        """end the stream, and get the last top-level boxes"""
+        box_list = []
+        if self.skipped_box is not None:
+            if self.skip_end is not None:
+                raise Exception(
+                    f"error: PushParser truncated box type: {self.skipped_box.box_type} at 0x{self.offset:08x}"
+                )
+            # size=0 box: it extends to the end of the stream
+            self.skipped_box.max_offset = self.offset
+            self.skipped_box = None
+        elif self.buf:
+            header = parse_box_header(self.buf, self.offset)
+            if header is None:
+                raise Exception(
+                    f"error: PushParser truncated box header at 0x{self.offset:08x}"
+                )
+            size, _, box_type = header
+            if size != 0:
+                raise Exception(
+                    f"error: PushParser truncated box type: {box_type} at 0x{self.offset:08x}"
+                )
+            # size=0 box: it extends to the end of the stream
+            length = len(self.buf)
+            box_list.append(self.read_box(length, self.offset + length))
+            self.offset += length
+            self.buf.clear()
+        return box_list
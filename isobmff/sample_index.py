@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+import array
+import bisect
+import itertools
+import operator
+
+from .box import find_child
+from .box import get_subboxes
+
+
+def expand_runs(counts, values, typecode, length):
+    """expand (count, value) runs into an array of length items
+
+    Missing items are set to 0, and extra ones are dropped.
+    """
+    column = array.array(typecode)
+    for count, value in zip(counts, values):
+        column.extend(array.array(typecode, [value]) * count)
+        if len(column) >= length:
+            del column[length:]
+            return column
+    column.extend(array.array(typecode, [0]) * (length - len(column)))
+    return column
+
+
+class SampleIndex:
+    """Per-sample information of a (non-fragmented) track.
+
+    Built from the children of the track "stbl" box (stsz, stsc,
+    stco/co64, stts, ctts, and stss), with one array.array column per
+    field, indexed by sample number - 1:
+
+    * offsets: absolute file offset of the sample
+    * sizes: sample size in bytes
+    * dts: decode time, in timescale units
+    * cts: composition time (dts plus the "ctts" offset)
+    * sync: 1 for sync samples (all of them if there is no "stss" box)
+
+    Seek times are in microseconds on the media timeline (edit lists
+    are not applied).
+    """
+
+    def __init__(self, track_id, timescale, offsets, sizes, dts, cts, sync):
+        self.track_id = track_id
+        self.timescale = timescale
+        self.offsets = offsets
+        self.sizes = sizes
+        self.dts = dts
+        self.cts = cts
+        self.sync = sync
+        # sample indices and composition times of the sync samples
+        # (built on the first seek)
+        self.sync_indices = None
+        self.sync_cts = None
+
+    @classmethod
+    def from_track(cls, trak):
+        """build the sample index of a "trak" box"""
+        tkhd = find_child(trak, b"tkhd")
+        mdhd = find_child(trak, b"mdhd")
+        stbl = find_child(trak, b"stbl")
+        if stbl is None:
+            raise Exception(f"error: no stbl box in {trak.path}")
+        track_id = tkhd.track_id if tkhd is not None else None
+        timescale = mdhd.timescale if mdhd is not None else None
+        return cls.from_sample_table(stbl, track_id, timescale)
+
+    @classmethod
+    def from_sample_table(cls, stbl, track_id=None, timescale=None):
+        """build the sample index of a "stbl" box"""
+        stsz = find_child(stbl, b"stsz")
+        stsc = find_child(stbl, b"stsc")
+        stco = find_child(stbl, b"stco") or find_child(stbl, b"co64")
+        if stsz is None or stsc is None or stco is None:
+            raise Exception(f"error: incomplete sample table in {stbl.path}")
+        sizes = get_sample_sizes(stsz)
+        offsets = get_sample_offsets(stsc, stco, sizes)
+        count = len(sizes)
+        stts = find_child(stbl, b"stts")
+        if stts is not None:
+            deltas = expand_runs(stts.sample_counts, stts.sample_deltas, "q", count)
+        else:
+            deltas = array.array("q", [0]) * count
+        # decode time of each sample: sum of the previous deltas
+        dts = array.array("q", itertools.accumulate(deltas, initial=0))
+        del dts[count:]
+        ctts = find_child(stbl, b"ctts")
+        if ctts is not None:
+            composition_offsets = expand_runs(
+                ctts.sample_counts, ctts.sample_offsets, "q", count
+            )
+            cts = array.array("q", map(operator.add, dts, composition_offsets))
+        else:
+            cts = array.array("q", dts)
+        stss = find_child(stbl, b"stss")
+        if stss is not None:
+            sync = array.array("B", [0]) * count
+            for sample_number in stss.sample_numbers:
+                if 0 < sample_number <= count:
+                    sync[sample_number - 1] = 1
+        else:
+            sync = array.array("B", [1]) * count
+        return cls(track_id, timescale, offsets, sizes, dts, cts, sync)
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def check_timescale(self):
+        if not self.timescale:
+            raise Exception(
+                f"error: track {self.track_id} has no timescale (missing mdhd "
+                "box): times in microseconds are not available"
+            )
+
+    def to_timescale(self, time_us):
+        self.check_timescale()
+        return time_us * self.timescale // 1000000
+
+    def to_microseconds(self, time):
+        self.check_timescale()
+        return time * 1000000 // self.timescale
+
+    def get_sample_at(self, time_us):
+        """get the index of the sample decoded at time_us (or -1)
+
+        dts holds the prefix sums of the sample durations, so this is
+        a binary search.
+        """
+        return bisect.bisect_right(self.dts, self.to_timescale(time_us)) - 1
+
+    def seek(self, time_us):
+        """get the last sync sample presented at or before time_us
+
+        Returns an (index, offset, time_us) tuple, where time_us is the
+        composition time of the sync sample. Times before the first sync
+        sample get the first sync sample. Returns None if the track has
+        no sync samples.
+        """
+        if self.sync_indices is None:
+            self.build_sync_table()
+        pos = bisect.bisect_right(self.sync_cts, self.to_timescale(time_us)) - 1
+        return self.get_seek_point(pos)
+
+    def seek_batch(self, times_us):
+        """seek() for many times at once (returns a list, in query order)"""
+        if self.sync_indices is None:
+            self.build_sync_table()
+        self.check_timescale()
+        timescale = self.timescale
+        sync_cts = self.sync_cts
+        return [
+            self.get_seek_point(
+                bisect.bisect_right(sync_cts, time_us * timescale // 1000000) - 1
+            )
+            for time_us in times_us
+        ]
+
+    def build_sync_table(self):
+        self.sync_indices = array.array(
+            "Q", itertools.compress(range(len(self.sync)), self.sync)
+        )
+        # sync samples are not reordered around each other, so their
+        # composition times are increasing
+        self.sync_cts = array.array("q", map(self.cts.__getitem__, self.sync_indices))
+
+    def get_seek_point(self, pos):
+        if not self.sync_indices:
+            return None
+        # before the first sync sample: nothing earlier can be decoded
+        pos = max(pos, 0)
+        idx = self.sync_indices[pos]
+        return idx, self.offsets[idx], self.to_microseconds(self.sync_cts[pos])
+
+    def get_sample(self, idx):
+        """get (offset, size, dts, cts, sync) for sample idx (0-based)"""
+        return (
+            self.offsets[idx],
+            self.sizes[idx],
+            self.dts[idx],
+            self.cts[idx],
+            bool(self.sync[idx]),
+        )
+
+
+class FragmentSampleIndex(SampleIndex):
+    """Per-sample information of a fragmented track.
+
+    Samples are added one movie fragment at a time with add_fragment(),
+    so the index can grow as fragments are appended to the file. Each
+    "trun" field falls back to the "tfhd" default, and then to the
+    "trex" default, and sample offsets follow the base data offset
+    rules of ISO/IEC 14496-12:2022, Section 8.8.7.1. On top of the
+    SampleIndex columns, it has:
+
+    * durations: sample duration, in timescale units
+    * flags: sample flags
+
+    trexs maps the track ID to its "trex" box, for all the tracks, as
+    the track fragments of the other tracks are walked to find where
+    the data of the next one starts.
+    """
+
+    # sample_is_non_sync_sample bit of the sample flags
+    NON_SYNC_SAMPLE_FLAG = 0x00010000
+
+    def __init__(self, track_id, timescale=None, trexs=None):
+        super().__init__(
+            track_id,
+            timescale,
+            array.array("Q"),
+            array.array("I"),
+            array.array("q"),
+            array.array("q"),
+            array.array("B"),
+        )
+        self.durations = array.array("I")
+        self.flags = array.array("I")
+        self.trexs = trexs if trexs is not None else {}
+        # decode time of the next sample, for fragments without "tfdt"
+        self.next_dts = 0
+
+    @classmethod
+    def from_movie(cls, moov, track_id):
+        """create an empty index for a track of a "moov" box"""
+        timescale = None
+        for trak in get_subboxes(moov):
+            if trak.box_type != b"trak":
+                continue
+            tkhd = find_child(trak, b"tkhd")
+            if tkhd is not None and tkhd.track_id == track_id:
+                mdhd = find_child(trak, b"mdhd")
+                timescale = mdhd.timescale if mdhd is not None else None
+        trexs = {}
+        mvex = find_child(moov, b"mvex")
+        if mvex is not None:
+            for box in mvex.box_list:
+                if box.box_type == b"trex":
+                    trexs[box.track_ID] = box
+        return cls(track_id, timescale, trexs)
+
+    def add_fragment(self, moof):
+        """add the samples of the track in a "moof" box"""
+        moof.load()
+        # end of the data of the previous track fragment
+        data_end = moof.offset
+        for traf in moof.box_list:
+            if traf.box_type != b"traf":
+                continue
+            data_end = self.add_track_fragment(moof, traf, data_end)
+        # the seek table is stale
+        self.sync_indices = None
+        self.sync_cts = None
+
+    def add_track_fragment(self, moof, traf, data_end):
+        tfhd = find_child(traf, b"tfhd")
+        if tfhd is None:
+            raise Exception(f"error: no tfhd box in {traf.path}")
+        if (tfhd.flags & tfhd.FLAGS["base-data-offset-present"]) != 0:
+            base_data_offset = tfhd.base_data_offset
+        elif (tfhd.flags & tfhd.FLAGS["default-base-is-moof"]) != 0:
+            base_data_offset = moof.offset
+        else:
+            # the first track fragment defaults to the start of the
+            # "moof" box, and the next ones to the end of the previous
+            # track fragment data
+            base_data_offset = data_end
+        is_track = tfhd.track_id == self.track_id
+        tfdt = find_child(traf, b"tfdt")
+        if is_track and tfdt is not None:
+            self.next_dts = tfdt.baseMediaDecodeTime
+        data_end = base_data_offset
+        for trun in traf.box_list:
+            if trun.box_type != b"trun":
+                continue
+            if (trun.flags & trun.FLAGS["data-offset-present"]) != 0:
+                data_end = base_data_offset + trun.data_offset
+            sizes = self.get_column(trun, tfhd, "sample_size")
+            if is_track:
+                self.add_run(trun, tfhd, data_end, sizes)
+            data_end += sum(sizes)
+        return data_end
+
+    def add_run(self, trun, tfhd, data_offset, sizes):
+        durations = self.get_column(trun, tfhd, "sample_duration")
+        flags = array.array("I", self.get_column(trun, tfhd, "sample_flags"))
+        if (trun.flags & trun.FLAGS["first-sample-flags-present"]) != 0 and flags:
+            flags[0] = trun.first_sample_flags
+        composition_offsets = trun.columns.get(
+            "sample_composition_time_offset",
+            array.array("i", [0]) * trun.sample_count,
+        )
+        offsets = itertools.accumulate(sizes, initial=data_offset)
+        self.offsets.extend(itertools.islice(offsets, len(sizes)))
+        self.sizes.extend(sizes)
+        dts = array.array("q", itertools.accumulate(durations, initial=self.next_dts))
+        self.next_dts = dts.pop()
+        self.dts.extend(dts)
+        self.cts.extend(map(operator.add, dts, composition_offsets))
+        self.durations.extend(durations)
+        self.flags.extend(flags)
+        self.sync.extend(
+            array.array(
+                "B",
+                [(flag & self.NON_SYNC_SAMPLE_FLAG) == 0 for flag in flags],
+            )
+        )
+
+    def get_column(self, trun, tfhd, name):
+        """get a per-sample field of a "trun" box, resolving defaults"""
+        column = trun.columns.get(name)
+        if column is not None:
+            return column
+        default = getattr(tfhd, "default_" + name, None)
+        trex = self.trexs.get(tfhd.track_id)
+        if default is None and trex is not None:
+            default = getattr(trex, "default_" + name)
+        if default is None:
+            raise Exception(f"error: no {name} for the samples in {trun.path}")
+        return array.array("I", [default]) * trun.sample_count
+
+
+def get_sample_sizes(stsz):
+    if stsz.sample_size != 0:
+        # constant sample size
+        return array.array("I", [stsz.sample_size]) * stsz.sample_count
+    return stsz.entry_sizes
+
+
+def get_sample_offsets(stsc, stco, sizes):
+    """get the absolute file offset of each sample"""
+    chunk_count = len(stco.chunk_offsets)
+    # number of samples in each chunk
+    samples_per_chunk = array.array("I")
+    last_chunks = itertools.chain(stsc.first_chunks[1:], (chunk_count + 1,))
+    for first_chunk, last_chunk, count in zip(
+        stsc.first_chunks, last_chunks, stsc.samples_per_chunks
+    ):
+        last_chunk = min(last_chunk, chunk_count + 1)
+        if last_chunk > first_chunk:
+            samples_per_chunk.extend(
+                array.array("I", [count]) * (last_chunk - first_chunk)
+            )
+    # the offset of a sample is the offset of its chunk, plus the size
+    # of the previous samples in the chunk. With the size prefix sums,
+    # this is (chunk_offset - prefix[first_sample]) + prefix[sample]
+    prefix = array.array("q", itertools.accumulate(sizes, initial=0))
+    first_samples = itertools.accumulate(samples_per_chunk, initial=0)
+    bases = []
+    for chunk_offset, first_sample in zip(stco.chunk_offsets, first_samples):
+        if first_sample >= len(sizes):
+            break
+        bases.append(chunk_offset - prefix[first_sample])
+    sample_bases = itertools.chain.from_iterable(
+        map(itertools.repeat, bases, samples_per_chunk)
+    )
+    offsets = array.array("Q", map(operator.add, sample_bases, prefix[:-1]))
+    if len(offsets) < len(sizes):
+        raise Exception(
+            f"error: sample table chunks only cover {len(offsets)} of "
+            f"{len(sizes)} samples in {stsc.path}"
+        )
+    return offsets
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+import bisect
+import os
+
+
+# largest gap between two samples fetched with a single read (the gap
+# bytes are read and dropped)
+SAMPLE_READ_MAX_GAP = 64 * 1024
+
+# largest read that merges several samples
+SAMPLE_READ_MAX_SIZE = 8 * 1024 * 1024
+
+
+class SampleReader:
+    """Reads sample payloads using a SampleIndex (or FragmentSampleIndex).
+
+    Requested samples are sorted by file offset, and samples that are
+    adjacent (or less than max_gap bytes apart) are fetched with a
+    single read of up to max_size bytes. Payloads are memoryview slices
+    of those reads (or zero-copy slices of the file map, if media_file
+    was read with use_mmap=True).
+
+    bytes_read and read_count count the I/O done so far.
+    """
+
+    def __init__(
+        self,
+        media_file,
+        sample_index,
+        max_gap=SAMPLE_READ_MAX_GAP,
+        max_size=SAMPLE_READ_MAX_SIZE,
+    ):
+        self.media_file = media_file
+        self.sample_index = sample_index
+        self.max_gap = max_gap
+        self.max_size = max_size
+        self.fd = None
+        self.bytes_read = 0
+        self.read_count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def iter_samples(self, indices=None):
+        """yield (idx, payload) for the samples in indices (all by default)
+
+        Samples are yielded in file offset order, not in indices order.
+        """
+        offsets = self.sample_index.offsets
+        sizes = self.sample_index.sizes
+        if indices is None:
+            indices = range(len(sizes))
+        indices = sorted(indices, key=offsets.__getitem__)
+        max_gap = self.max_gap
+        max_size = self.max_size
+        # the current run is indices[run_first:pos], and spans the bytes
+        # in [run_start, run_end)
+        run_first = 0
+        run_start = run_end = 0
+        for pos, idx in enumerate(indices):
+            start = offsets[idx]
+            end = start + sizes[idx]
+            if pos == run_first:
+                run_start = start
+                run_end = end
+            elif start - run_end > max_gap or end - run_start > max_size:
+                yield from self.read_run(indices[run_first:pos], run_start, run_end)
+                run_first = pos
+                run_start = start
+                run_end = end
+            elif end > run_end:
+                run_end = end
+        if indices:
+            yield from self.read_run(indices[run_first:], run_start, run_end)
+
+    def iter_time_range(self, start_us, end_us):
+        """yield (idx, payload) for the samples decoded in [start_us, end_us)
+
+        Use SampleIndex.seek() first to start at a sync sample.
+        """
+        dts = self.sample_index.dts
+        first = bisect.bisect_left(dts, self.sample_index.to_timescale(start_us))
+        last = bisect.bisect_left(dts, self.sample_index.to_timescale(end_us))
+        return self.iter_samples(range(first, last))
+
+    def read_samples(self, indices):
+        """get the payloads of the samples in indices, in indices order"""
+        payloads = dict(self.iter_samples(indices))
+        return [payloads[idx] for idx in indices]
+
+    def read_run(self, run, run_start, run_end):
+        """read [run_start, run_end) at once, and slice the samples of run"""
+        data = self.read_bytes(run_start, run_end - run_start)
+        offsets = self.sample_index.offsets
+        sizes = self.sample_index.sizes
+        result = []
+        for idx in run:
+            start = offsets[idx] - run_start
+            result.append((idx, data[start : start + sizes[idx]]))
+        return result
+
+    def read_bytes(self, offset, size):
+        self.bytes_read += size
+        self.read_count += 1
+        mm = self.media_file.mmap
+        if mm is not None:
+            # slicing would silently return fewer bytes
+            if offset + size > len(mm):
+                raise Exception(
+                    f"error: truncated sample data at 0x{max(offset, len(mm)):08x}"
+                )
+            return memoryview(mm)[offset : offset + size]
+        if self.fd is None:
+            self.fd = os.open(self.media_file.filename, os.O_RDONLY)
+        data = os.pread(self.fd, size, offset)
+        if len(data) < size:
+            raise Exception(
+                f"error: truncated sample data at 0x{offset + len(data):08x}"
+            )
+        return memoryview(data)
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+import array
+import os
+
+from .box import decode_posix_portable_filename
+from .buffer_file import BufferFile
+
+
+# boxes whose payload is just a list of boxes
+CONTAINER_BOX_TYPES = (
+    b"moov",
+    b"trak",
+    b"mdia",
+    b"minf",
+    b"stbl",
+    b"moof",
+    b"traf",
+    b"meta",
+    b"iprp",
+    b"ipco",
+    b"dinf",
+    b"edts",
+    b"mvex",
+)
+
+# containers up to this size are read at once, and scanned from memory
+SCAN_READAHEAD_SIZE = 1024 * 1024
+
+
+class BoxIndex:
+    """Flat box index, stored as array-backed columns.
+
+    Entry i describes the i-th box found (in file order):
+    * offset: file offset of the box
+    * header_size: size of the box header (size, type, largesize,
+      and extended type fields)
+    * size: box size, including the header (largesize if used)
+    * fourcc: box type, as a big-endian uint32
+    * depth: 0 for top-level boxes
+    * parent_index: index of the parent box, or -1 for top-level boxes
+    """
+
+    def __init__(self):
+        self.offset = array.array("Q")
+        self.header_size = array.array("B")
+        self.size = array.array("Q")
+        self.fourcc = array.array("I")
+        self.depth = array.array("B")
+        self.parent_index = array.array("q")
+
+    def append(self, offset, header_size, size, fourcc, depth, parent_index):
+        self.offset.append(offset)
+        self.header_size.append(header_size)
+        self.size.append(size)
+        self.fourcc.append(int.from_bytes(fourcc, byteorder="big"))
+        self.depth.append(depth)
+        self.parent_index.append(parent_index)
+        return len(self.offset) - 1
+
+    def __len__(self):
+        return len(self.offset)
+
+    def __getitem__(self, idx):
+        return (
+            self.offset[idx],
+            self.header_size[idx],
+            self.size[idx],
+            self.get_fourcc(idx),
+            self.depth[idx],
+            self.parent_index[idx],
+        )
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def get_fourcc(self, idx):
+        return self.fourcc[idx].to_bytes(4, byteorder="big")
+
+    def find(self, fourcc):
+        """get the indices of all the boxes of a given type"""
+        value = int.from_bytes(fourcc, byteorder="big")
+        return [idx for idx, val in enumerate(self.fourcc) if val == value]
+
+    def get_paths(self):
+        """get the box paths, using the same naming as Box.get_path()"""
+        paths = []
+        subpaths = {}
+        for idx in range(len(self)):
+            parent_index = self.parent_index[idx]
+            parent_path = paths[parent_index] if parent_index >= 0 else ""
+            box_type_str = decode_posix_portable_filename(self.get_fourcc(idx))
+            # count siblings of the same type
+            counts = subpaths.setdefault(parent_index, {})
+            count = counts.get(box_type_str, 1)
+            counts[box_type_str] = count + 1
+            suffix = str(count) if count > 1 else ""
+            paths.append(parent_path + "/" + box_type_str + suffix)
+        return paths
+
+
+def read_box_header(file, max_offset):
+    """read a box header
+
+    Returns a (size, header_size, box_type) tuple, or None if there is
+    no space left for a box header.
+    """
+    offset = file.tell()
+    if max_offset - offset < 8:
+        return None
+    header = file.read(8)
+    if len(header) < 8:
+        return None
+    size = int.from_bytes(header[0:4], byteorder="big")
+    box_type = header[4:8]
+    header_size = 8
+    if size == 1:
+        largesize = file.read(8)
+        if len(largesize) < 8:
+            raise Exception(
+                f"error: scan() no space for largesize field at 0x{offset:08x}"
+            )
+        size = int.from_bytes(largesize, byteorder="big")
+        header_size += 8
+    elif size == 0:
+        # box extends to the end of the enclosing container (or file)
+        size = max_offset - offset
+    if box_type == b"uuid":
+        header_size += 16
+    if size < header_size:
+        raise Exception(
+            f"error: scan() invalid box size {size} type: {box_type} at 0x{offset:08x}"
+        )
+    return size, header_size, box_type
+
+
+def scan_range(file, offset, max_offset, depth, parent_index, index, containers):
+    while offset < max_offset:
+        file.seek(offset)
+        header = read_box_header(file, max_offset)
+        if header is None:
+            break
+        size, header_size, box_type = header
+        box_index = index.append(
+            offset, header_size, size, box_type, depth, parent_index
+        )
+        end_offset = min(offset + size, max_offset)
+        if box_type in containers:
+            payload_offset = offset + header_size
+            if box_type == b"meta":
+                payload_offset += get_meta_header_size(file, payload_offset)
+            if (
+                not isinstance(file, BufferFile)
+                and end_offset - payload_offset <= SCAN_READAHEAD_SIZE
+            ):
+                # small container: scan it from memory
+                file.seek(payload_offset)
+                buf = BufferFile(file.read(end_offset - payload_offset), payload_offset)
+                scan_range(
+                    buf,
+                    payload_offset,
+                    end_offset,
+                    depth + 1,
+                    box_index,
+                    index,
+                    containers,
+                )
+            else:
+                scan_range(
+                    file,
+                    payload_offset,
+                    end_offset,
+                    depth + 1,
+                    box_index,
+                    index,
+                    containers,
+                )
+        offset = end_offset
+
+
+def get_meta_header_size(file, payload_offset):
+    # MetaBox is a FullBox, but some streams write it as a Box (see
+    # MetaBox.read())
+    file.seek(payload_offset + 4)
+    if file.read(4) == b"hdlr":
+        return 0
+    return 4
+
+
+def scan(path, containers=CONTAINER_BOX_TYPES):
+    """scan the box headers of an ISOBMFF file
+
+    Only box headers are read: the scanner recurses into container boxes
+    (see CONTAINER_BOX_TYPES), and seeks past the payload of all the
+    other boxes.
+
+    Returns a BoxIndex.
+    """
+    index = BoxIndex()
+    with open(path, "rb") as file:
+        max_offset = os.fstat(file.fileno()).st_size
+        scan_range(file, 0, max_offset, 0, -1, index, containers)
+    return index
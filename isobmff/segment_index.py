@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import array
+import bisect
+
+
+class SegmentIndex:
+    """Byte ranges and times of the (sub)segments of a "sidx" chain.
+
+    Built from one or more root "sidx" boxes, following the references
+    to other "sidx" boxes (hierarchical and daisy-chained indexes), so
+    each segment is a media reference. One array.array column per
+    field, in segment order:
+
+    * starts: absolute file offset of the first byte of the segment
+    * ends: absolute file offset of the byte after the segment
+    * times: earliest presentation time, in timescale units
+    * durations: subsegment duration, in timescale units
+    * starts_with_sap, sap_types, sap_delta_times: SAP information
+
+    Times of query methods are in microseconds.
+    """
+
+    def __init__(self, reference_id, timescale):
+        self.reference_id = reference_id
+        self.timescale = timescale
+        self.starts = array.array("Q")
+        self.ends = array.array("Q")
+        self.times = array.array("q")
+        self.durations = array.array("I")
+        self.starts_with_sap = array.array("B")
+        self.sap_types = array.array("B")
+        self.sap_delta_times = array.array("I")
+
+    @classmethod
+    def from_boxes(cls, sidx_boxes, reference_id=None):
+        """build the segment index of a track from all the "sidx" boxes
+
+        reference_id selects the track (the first one by default).
+        """
+        sidx_boxes = {box.offset: box for box in sidx_boxes}
+        # boxes referenced by other boxes are not roots
+        referenced = set()
+        for box in sidx_boxes.values():
+            for offset, reference in get_references(box):
+                if reference["reference_type"] == 1:
+                    referenced.add(offset)
+        segment_index = None
+        for offset in sorted(sidx_boxes):
+            box = sidx_boxes[offset]
+            if offset in referenced:
+                continue
+            if reference_id is not None and box.reference_ID != reference_id:
+                continue
+            if segment_index is None:
+                segment_index = cls(box.reference_ID, box.timescale)
+                reference_id = box.reference_ID
+            segment_index.add_sidx(box, sidx_boxes)
+        return segment_index
+
+    def add_sidx(self, box, sidx_boxes, depth=0):
+        """add the segments referenced by a "sidx" box"""
+        if depth > len(sidx_boxes):
+            raise Exception(f"error: sidx reference loop at 0x{box.offset:08x}")
+        time = box.earliest_presentation_time
+        for offset, reference in get_references(box):
+            if reference["reference_type"] == 1:
+                child = sidx_boxes.get(offset)
+                if child is None:
+                    raise Exception(f"error: no sidx box at 0x{offset:08x}")
+                self.add_sidx(child, sidx_boxes, depth + 1)
+            else:
+                self.starts.append(offset)
+                self.ends.append(offset + reference["reference_size"])
+                self.times.append(time * self.timescale // box.timescale)
+                self.durations.append(
+                    reference["subsegment_duration"] * self.timescale // box.timescale
+                )
+                self.starts_with_sap.append(reference["starts_with_SAP"])
+                self.sap_types.append(reference["SAP_type"])
+                self.sap_delta_times.append(reference["SAP_delta_time"])
+            time += reference["subsegment_duration"]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def find_segment(self, time_us):
+        """get the index of the segment that covers time_us (or -1)"""
+        time = time_us * self.timescale // 1000000
+        idx = bisect.bisect_right(self.times, time) - 1
+        if idx < 0 or time >= self.times[idx] + self.durations[idx]:
+            return -1
+        return idx
+
+    def get_segment(self, idx):
+        """get (start, end, time, duration, starts_with_SAP, SAP_type,
+        SAP_delta_time) for segment idx"""
+        return (
+            self.starts[idx],
+            self.ends[idx],
+            self.times[idx],
+            self.durations[idx],
+            self.starts_with_sap[idx],
+            self.sap_types[idx],
+            self.sap_delta_times[idx],
+        )
+
+    def get_byte_range(self, time_us):
+        """get the (start, end) byte range of the segment that covers
+        time_us (end excluded), or None"""
+        idx = self.find_segment(time_us)
+        if idx < 0:
+            return None
+        return self.starts[idx], self.ends[idx]
+
+
+def get_references(box):
+    """yield (offset, reference) for each reference of a "sidx" box
+
+    The first reference starts first_offset bytes after the end of the
+    box, and each one starts where the previous one ends.
+    """
+    offset = box.offset + box.get_size() + box.first_offset
+    for reference in box.references:
+        yield offset, reference
+        offset += reference["reference_size"]
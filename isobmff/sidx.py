@@ -1,27 +1,46 @@
 # -*- coding: utf-8 -*-
+import struct
+
 from .box import FullBox
-from .box import read_uint
+from .box import read_struct
+from .box import read_struct_array
 
 
 # ISO/IEC 14496-12:2022, Section 8.16.3
 class SegmentIndexBox(FullBox):
+    __slots__ = (
+        "reference_ID",
+        "timescale",
+        "earliest_presentation_time",
+        "first_offset",
+        "reserved",
+        "references",
+    )
     box_type = b"sidx"
+    # fixed-layout fields, per version
+    FIELDS = {
+        0: struct.Struct(">IIIIHH"),
+        1: struct.Struct(">IIQQHH"),
+    }
+    REFERENCE = struct.Struct(">III")
 
     def read(self, file):
-        self.reference_ID = read_uint(file, 4)
-        self.timescale = read_uint(file, 4)
-        count_size = 4 if self.version == 0 else 8
-        self.earliest_presentation_time = read_uint(file, count_size)
-        self.first_offset = read_uint(file, count_size)
-        self.reserved = read_uint(file, 2)
-        reference_count = read_uint(file, 2)
+        (
+            self.reference_ID,
+            self.timescale,
+            self.earliest_presentation_time,
+            self.first_offset,
+            self.reserved,
+            reference_count,
+        ) = read_struct(file, self.FIELDS[0 if self.version == 0 else 1])
         self.references = []
-        for _ in range(reference_count):
+        for word1, subsegment_duration, word2 in read_struct_array(
+            file, self.REFERENCE, reference_count
+        ):
             reference = {}
-            word1 = read_uint(file, 4)
             reference["reference_type"] = word1 >> 31
             reference["reference_size"] = word1 & 0x7FFFFFFF
-            word2 = read_uint(file, 4)
+            reference["subsegment_duration"] = subsegment_duration
             reference["starts_with_SAP"] = word2 >> 31
             reference["SAP_type"] = (word2 >> 28) & 0x7
             reference["SAP_delta_time"] = word2 & 0x0FFFFFFF
@@ -40,6 +59,12 @@ class SegmentIndexBox(FullBox):
         for idx, val in enumerate(self.references):
             tuples += ((f'reference[{idx}]["reference_type"]', val["reference_type"]),)
             tuples += ((f'reference[{idx}]["reference_size"]', val["reference_size"]),)
+            tuples += (
+                (
+                    f'reference[{idx}]["subsegment_duration"]',
+                    val["subsegment_duration"],
+                ),
+            )
             tuples += (
                 (f'reference[{idx}]["starts_with_SAP"]', val["starts_with_SAP"]),
             )
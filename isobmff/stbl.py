@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
+import struct
+
 from .box import Box
 from .box import FullBox
 from .box import ContainerBox
 from .box import Quantity
-from .box import read_uint, read_sint
-from .box import read_fixed_size_string
+from .box import read_uint
+from .box import read_struct
 from .box import read_utf8string
 
 
@@ -17,12 +19,12 @@ class SampleTableBox(ContainerBox):
 
 # ISO/IEC 14496-12:2022, Section 8.5.2.2
 class SampleEntry(Box):
+    FIELDS = struct.Struct(">6BH")
+
     def read(self, file):
-        self.reserved0 = []
-        for _ in range(6):
-            reserved = read_uint(file, 1)
-            self.reserved0.append(reserved)
-        self.data_reference_index = read_uint(file, 2)
+        values = read_struct(file, SampleEntry.FIELDS)
+        self.reserved0 = list(values[0:6])
+        self.data_reference_index = values[6]
 
     def contents(self):
         tuples = super().contents()
@@ -74,22 +76,23 @@ class SampleDescriptionBox(FullBox):
 # ISO/IEC 14496-12:2022, Section 12.1.3.2
 # ISO/IEC 14496-14:2020, Section 6.7.2
 class VisualSampleEntry(SampleEntry):
+    FIELDS = struct.Struct(">HH 3I HH III H 32s Hh")
+
     def read(self, file):
         super().read(file)
-        self.pre_defined1 = read_uint(file, 2)
-        self.reserved1 = read_uint(file, 2)
-        self.pre_defined2 = []
-        for _ in range(3):
-            self.pre_defined2.append(read_uint(file, 4))
-        self.width = read_uint(file, 2)
-        self.height = read_uint(file, 2)
-        self.horizresolution = read_uint(file, 4)
-        self.vertresolution = read_uint(file, 4)
-        self.reserved2 = read_uint(file, 4)
-        self.frame_count = read_uint(file, 2)
-        self.compressorname = read_fixed_size_string(file, 32)
-        self.depth = read_uint(file, 2)
-        self.pre_defined3 = read_sint(file, 2)
+        values = read_struct(file, VisualSampleEntry.FIELDS)
+        self.pre_defined1 = values[0]
+        self.reserved1 = values[1]
+        self.pre_defined2 = list(values[2:5])
+        self.width = values[5]
+        self.height = values[6]
+        self.horizresolution = values[7]
+        self.vertresolution = values[8]
+        self.reserved2 = values[9]
+        self.frame_count = values[10]
+        self.compressorname = values[11].decode("ascii")
+        self.depth = values[12]
+        self.pre_defined3 = values[13]
         self.box_list = self.read_box_list(file)
 
     def contents(self):
@@ -115,16 +118,17 @@ class VisualSampleEntry(SampleEntry):
 # ISO/IEC 14496-12:2022, Section 12.2.3.2
 # ISO/IEC 14496-14:2020, Section 6.7.2
 class AudioSampleEntry(SampleEntry):
+    FIELDS = struct.Struct(">2I HHHH I")
+
     def read(self, file):
         super().read(file)
-        self.reserved1 = []
-        for _ in range(2):
-            self.reserved1.append(read_uint(file, 4))
-        self.channelcount = read_uint(file, 2)
-        self.samplesize = read_uint(file, 2)
-        self.pre_defined = read_uint(file, 2)
-        self.reserved2 = read_uint(file, 2)
-        self.samplerate = read_uint(file, 4)
+        values = read_struct(file, AudioSampleEntry.FIELDS)
+        self.reserved1 = list(values[0:2])
+        self.channelcount = values[2]
+        self.samplesize = values[3]
+        self.pre_defined = values[4]
+        self.reserved2 = values[5]
+        self.samplerate = values[6]
         # parse the boxes
         self.box_list = self.read_box_list(file)
 
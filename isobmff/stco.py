@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from .box import FullBox
 from .box import Quantity
+from .box import read_array
 from .box import read_uint
 
 
@@ -12,16 +13,17 @@ class ChunkOffsetBox(FullBox):
 
     def read(self, file):
         entry_count = read_uint(file, 4)
-        self.entries = []
-        for _ in range(entry_count):
-            entry = {}
-            entry["chunk_offset"] = read_uint(file, 4)
-            self.entries.append(entry)
+        self.chunk_offsets = read_array(file, "I", entry_count)
+
+    @property
+    def entries(self):
+        # one dict per entry (compatibility view of the columns)
+        return [{"chunk_offset": chunk_offset} for chunk_offset in self.chunk_offsets]
 
     def contents(self):
         tuples = super().contents()
-        for idx, val in enumerate(self.entries):
-            tuples += ((f'entry[{idx}]["chunk_offset"]', val["chunk_offset"]),)
+        for idx, val in enumerate(self.chunk_offsets):
+            tuples += ((f'entry[{idx}]["chunk_offset"]', val),)
         return tuples
 
 
@@ -31,14 +33,15 @@ class ChunkLargeOffsetBox(FullBox):
 
     def read(self, file):
         entry_count = read_uint(file, 4)
-        self.entries = []
-        for _ in range(entry_count):
-            entry = {}
-            entry["chunk_offset"] = read_uint(file, 8)
-            self.entries.append(entry)
+        self.chunk_offsets = read_array(file, "Q", entry_count)
+
+    @property
+    def entries(self):
+        # one dict per entry (compatibility view of the columns)
+        return [{"chunk_offset": chunk_offset} for chunk_offset in self.chunk_offsets]
 
     def contents(self):
         tuples = super().contents()
-        for idx, val in enumerate(self.entries):
-            tuples += ((f'entry[{idx}]["chunk_offset"]', val["chunk_offset"]),)
+        for idx, val in enumerate(self.chunk_offsets):
+            tuples += ((f'entry[{idx}]["chunk_offset"]', val),)
         return tuples
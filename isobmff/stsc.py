@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from .box import FullBox
 from .box import Quantity
+from .box import read_array
 from .box import read_uint
 from .box import read_bytes
 
@@ -13,13 +14,27 @@ class SampleToChunkBox(FullBox):
 
     def read(self, file):
         entry_count = read_uint(file, 4)
-        self.entries = []
-        for _ in range(entry_count):
-            entry = {}
-            entry["first_chunk"] = read_uint(file, 4)
-            entry["samples_per_chunk"] = read_uint(file, 4)
-            entry["sample_description_index"] = read_uint(file, 4)
-            self.entries.append(entry)
+        # (first_chunk, samples_per_chunk, sample_description_index)
+        values = read_array(file, "I", 3 * entry_count)
+        self.first_chunks = values[0::3]
+        self.samples_per_chunks = values[1::3]
+        self.sample_description_indices = values[2::3]
         # read the rest of the box
         max_len = self.max_offset - file.tell()
         self.remaining = read_bytes(file, max_len)
+
+    @property
+    def entries(self):
+        # one dict per entry (compatibility view of the columns)
+        return [
+            {
+                "first_chunk": first_chunk,
+                "samples_per_chunk": samples_per_chunk,
+                "sample_description_index": sample_description_index,
+            }
+            for first_chunk, samples_per_chunk, sample_description_index in zip(
+                self.first_chunks,
+                self.samples_per_chunks,
+                self.sample_description_indices,
+            )
+        ]
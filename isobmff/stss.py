@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from .box import FullBox
+from .box import read_array
 from .box import read_uint
 
 
@@ -10,8 +11,11 @@ class SyncSampleBox(FullBox):
 
     def read(self, file):
         entry_count = read_uint(file, 4)
-        self.entries = []
-        for _ in range(entry_count):
-            entry = {}
-            entry["sample_number"] = read_uint(file, 4)
-            self.entries.append(entry)
+        self.sample_numbers = read_array(file, "I", entry_count)
+
+    @property
+    def entries(self):
+        # one dict per entry (compatibility view of the columns)
+        return [
+            {"sample_number": sample_number} for sample_number in self.sample_numbers
+        ]
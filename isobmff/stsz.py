@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from .box import FullBox
+from .box import read_array
 from .box import read_uint
 
 
@@ -10,13 +11,15 @@ class SampleSizeBox(FullBox):
 
     def read(self, file):
         self.sample_size = read_uint(file, 4)
-        sample_count = read_uint(file, 4)
-        self.entries = []
-        if self.sample_size == 0:
-            for _ in range(sample_count):
-                entry = {}
-                entry["entry_size"] = read_uint(file, 4)
-                self.entries.append(entry)
+        self.sample_count = read_uint(file, 4)
+        # per-sample sizes are only present when sample_size is 0
+        count = self.sample_count if self.sample_size == 0 else 0
+        self.entry_sizes = read_array(file, "I", count)
+
+    @property
+    def entries(self):
+        # one dict per entry (compatibility view of the columns)
+        return [{"entry_size": entry_size} for entry_size in self.entry_sizes]
 
     def contents(self):
         tuples = super().contents()
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
+import array
+
 from .box import FullBox
+from .box import read_array
 from .box import read_uint
-from .box import read_sint
 
 
 # ISO/IEC 14496-12:2022, Section 8.6.1.2
@@ -11,12 +13,20 @@ class TimeToSampleBox(FullBox):
 
     def read(self, file):
         entry_count = read_uint(file, 4)
-        self.entries = []
-        for _ in range(entry_count):
-            entry = {}
-            entry["sample_count"] = read_uint(file, 4)
-            entry["sample_delta"] = read_uint(file, 4)
-            self.entries.append(entry)
+        # (sample_count, sample_delta) pairs
+        values = read_array(file, "I", 2 * entry_count)
+        self.sample_counts = values[0::2]
+        self.sample_deltas = values[1::2]
+
+    @property
+    def entries(self):
+        # one dict per entry (compatibility view of the columns)
+        return [
+            {"sample_count": sample_count, "sample_delta": sample_delta}
+            for sample_count, sample_delta in zip(
+                self.sample_counts, self.sample_deltas
+            )
+        ]
 
     def contents(self):
         tuples = super().contents()
@@ -33,15 +43,23 @@ class CompositionOffsetBox(FullBox):
 
     def read(self, file):
         entry_count = read_uint(file, 4)
-        self.entries = []
-        for _ in range(entry_count):
-            entry = {}
-            entry["sample_count"] = read_uint(file, 4)
-            if self.version == 0:
-                entry["sample_offset"] = read_uint(file, 4)
-            elif self.version == 1:
-                entry["sample_offset"] = read_sint(file, 4)
-            self.entries.append(entry)
+        # (sample_count, sample_offset) pairs
+        values = read_array(file, "I", 2 * entry_count)
+        self.sample_counts = values[0::2]
+        self.sample_offsets = values[1::2]
+        if self.version == 1:
+            # sample_offset is signed in version 1
+            self.sample_offsets = array.array("i", self.sample_offsets.tobytes())
+
+    @property
+    def entries(self):
+        # one dict per entry (compatibility view of the columns)
+        return [
+            {"sample_count": sample_count, "sample_offset": sample_offset}
+            for sample_count, sample_offset in zip(
+                self.sample_counts, self.sample_offsets
+            )
+        ]
 
     def contents(self):
         tuples = super().contents()
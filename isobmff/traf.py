@@ -1,13 +1,17 @@
 # -*- coding: utf-8 -*-
+import array
+
 from .box import Box
 from .box import FullBox
 from .box import Quantity
+from .box import read_array
 from .box import read_uint
 from .box import read_sint
 
 
 # ISO/IEC 14496-12:2022, Section 8.8.6
 class TrackFragmentBox(Box):
+    __slots__ = ("box_list",)
     box_type = b"traf"
 
     def read(self, file):
@@ -22,6 +26,14 @@ class TrackFragmentBox(Box):
 
 # ISO/IEC 14496-12:2022, Section 8.8.7
 class TrackFragmentHeaderBox(FullBox):
+    __slots__ = (
+        "track_id",
+        "base_data_offset",
+        "sample_description_index",
+        "default_sample_duration",
+        "default_sample_size",
+        "default_sample_flags",
+    )
     box_type = b"tfhd"
     is_mandatory = True
     quantity = Quantity.EXACTLY_ONE
@@ -32,6 +44,7 @@ class TrackFragmentHeaderBox(FullBox):
         "default-sample-size-present": 0x000010,
         "default-sample-flags-present": 0x000020,
         "duration-is-empty": 0x010000,
+        "default-base-is-moof": 0x020000,
     }
 
     def read(self, file):
@@ -85,6 +98,7 @@ class TrackFragmentHeaderBox(FullBox):
 
 # ISO/IEC 14496-12:2022, Section 8.8.8
 class TrackRunBox(FullBox):
+    __slots__ = ("sample_count", "data_offset", "first_sample_flags", "columns")
     box_type = b"trun"
     FLAGS = {
         "data-offset-present": 0x000001,
@@ -95,43 +109,52 @@ class TrackRunBox(FullBox):
         "sample-composition-time-offsets-present": 0x000800,
     }
 
+    # per-sample fields, in file order
+    SAMPLE_FIELDS = (
+        ("sample-duration-present", "sample_duration"),
+        ("sample-size-present", "sample_size"),
+        ("sample-flags-present", "sample_flags"),
+        ("sample-composition-time-offsets-present", "sample_composition_time_offset"),
+    )
+
     def read(self, file):
-        sample_count = read_uint(file, 4)
+        self.sample_count = read_uint(file, 4)
         if (self.flags & self.FLAGS["data-offset-present"]) == self.FLAGS[
             "data-offset-present"
         ]:
-            self.data_offset = read_sint(file, 8)
+            self.data_offset = read_sint(file, 4)
         if (self.flags & self.FLAGS["first-sample-flags-present"]) == self.FLAGS[
             "first-sample-flags-present"
         ]:
             self.first_sample_flags = read_uint(file, 4)
-        self.samples = []
-        for _ in range(sample_count):
-            sample = {}
-            if (self.flags & self.FLAGS["sample-duration-present"]) == self.FLAGS[
-                "sample-duration-present"
-            ]:
-                sample["sample_duration"] = read_uint(file, 4)
-            if (self.flags & self.FLAGS["sample-size-present"]) == self.FLAGS[
-                "sample-size-present"
-            ]:
-                sample["sample_size"] = read_uint(file, 4)
-            if (self.flags & self.FLAGS["sample-flags-present"]) == self.FLAGS[
-                "sample-flags-present"
-            ]:
-                sample["sample_flags"] = read_uint(file, 4)
-            if (
-                self.flags & self.FLAGS["sample-composition-time-offsets-present"]
-            ) == self.FLAGS["sample-composition-time-offsets-present"]:
-                if self.version == 0:
-                    sample["sample_composition_time_offset"] = read_uint(file, 4)
-                else:
-                    sample["sample_composition_time_offset"] = read_sint(file, 4)
-            self.samples.append(sample)
+        # the per-sample fields are 32-bit values: read them with a single
+        # read, and split them into one array.array column per field
+        names = [
+            name
+            for flag, name in self.SAMPLE_FIELDS
+            if (self.flags & self.FLAGS[flag]) == self.FLAGS[flag]
+        ]
+        values = read_array(file, "I", len(names) * self.sample_count)
+        self.columns = {}
+        for idx, name in enumerate(names):
+            self.columns[name] = values[idx :: len(names)]
+        if self.version != 0 and "sample_composition_time_offset" in self.columns:
+            # sample_composition_time_offset is signed in version 1
+            self.columns["sample_composition_time_offset"] = array.array(
+                "i", self.columns["sample_composition_time_offset"].tobytes()
+            )
         # skip the remaining data
         # TODO: this should be centralized
         file.seek(self.max_offset)
 
+    @property
+    def samples(self):
+        # one dict per sample (compatibility view of the columns)
+        if not self.columns:
+            return [{} for _ in range(self.sample_count)]
+        names = list(self.columns)
+        return [dict(zip(names, values)) for values in zip(*self.columns.values())]
+
     def contents(self):
         tuples = super().contents()
         if (self.flags & self.FLAGS["data-offset-present"]) == self.FLAGS[
@@ -174,6 +197,7 @@ class TrackRunBox(FullBox):
 
 # ISO/IEC 14496-12:2022, Section 8.8.12
 class TrackFragmentBaseMediaDecodeTimeBox(FullBox):
+    __slots__ = ("baseMediaDecodeTime",)
     box_type = b"tfdt"
 
     def read(self, file):
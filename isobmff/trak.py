@@ -1,9 +1,10 @@
 # -*- coding: utf-8 -*-
+import struct
+
 from .box import Box
 from .box import FullBox
 from .box import Quantity
-from .box import read_uint
-from .box import read_sint
+from .box import read_struct
 from .box import int_to_fixed_point_16_16
 
 
@@ -28,26 +29,27 @@ class TrackHeaderBox(FullBox):
     box_type = b"tkhd"
     is_mandatory = True
     quantity = Quantity.EXACTLY_ONE
+    # fixed-layout fields, per version
+    FIELDS = {
+        0: struct.Struct(">IIIII 2I hHHH 9I II"),
+        1: struct.Struct(">QQIIQ 2I hHHH 9I II"),
+    }
 
     def read(self, file):
-        read_size = 8 if self.version == 1 else 4
-        self.creation_time = read_uint(file, read_size)
-        self.modification_time = read_uint(file, read_size)
-        self.track_id = read_uint(file, 4)
-        self.reserved1 = read_uint(file, 4)
-        self.duration = read_uint(file, read_size)
-        self.reserved2 = []
-        for _ in range(2):
-            self.reserved2.append(read_uint(file, 4))
-        self.layer = read_sint(file, 2)
-        self.alternate_group = read_uint(file, 2)
-        self.volume = read_uint(file, 2)
-        self.reserved3 = read_uint(file, 2)
-        self.matrix = []
-        for _ in range(9):
-            self.matrix.append(read_uint(file, 4))
-        self.width = read_uint(file, 4)
-        self.height = read_uint(file, 4)
+        values = read_struct(file, self.FIELDS[1 if self.version == 1 else 0])
+        self.creation_time = values[0]
+        self.modification_time = values[1]
+        self.track_id = values[2]
+        self.reserved1 = values[3]
+        self.duration = values[4]
+        self.reserved2 = list(values[5:7])
+        self.layer = values[7]
+        self.alternate_group = values[8]
+        self.volume = values[9]
+        self.reserved3 = values[10]
+        self.matrix = list(values[11:20])
+        self.width = values[20]
+        self.height = values[21]
 
     def contents(self):
         tuples = super().contents()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""isobmff-bench.py: Microbenchmarks for the ISOBMFF parser."""
+
+import argparse
+import os
+import struct
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+dirname = os.path.dirname(sys.modules[__name__].__file__)
+this_dir = os.path.abspath(dirname)
+rootdir = os.path.join(this_dir, "..")
+sys.path.append(rootdir)
+
+import isobmff
+from isobmff.box import Box
+from isobmff.box import get_box_class
+from isobmff.box import get_class_list
+from isobmff.box import get_class_type
+from isobmff.box import get_subboxes
+from isobmff.box import read_box
+from isobmff.box import read_fixed_size_string
+from isobmff.box import read_sint
+from isobmff.box import read_uint
+
+__version__ = "0.1"
+
+FUNC_CHOICES = {
+    "dispatch": "per-box class dispatch cost (linear scan vs. registry)",
+    "bulk": "per-box decoding cost (per-field reads vs. bulk read + struct)",
+    "memory": "memory used per parsed box",
+}
+
+default_values = {
+    "debug": 0,
+    "func": "dispatch",
+    "number": 1000,
+    "infile": os.path.join(rootdir, "media", "C001.heic"),
+}
+
+
+def get_box_types(media_file):
+    # full box types of all the boxes in a parsed file
+    box_types = []
+
+    def walk(box):
+        box_types.append(box.box_type)
+        for child in get_subboxes(box):
+            walk(child)
+
+    for box in media_file.box_list:
+        walk(box)
+    return box_types
+
+
+def legacy_dispatch(full_box_type):
+    # pre-registry read_box() dispatch: walk the class tree and
+    # scan it linearly, then walk the MRO of the matching class
+    for box_class in get_class_list(Box):
+        if box_class.box_type == full_box_type:
+            return box_class, get_class_type(box_class)
+    return None
+
+
+def registry_dispatch(full_box_type):
+    return get_box_class(full_box_type)
+
+
+def bench(func, args, number):
+    # best-of-3 time per call, in microseconds
+    timer = timeit.Timer(lambda: [func(arg) for arg in args])
+    best = min(timer.repeat(repeat=3, number=number))
+    return best * 1e6 / (number * len(args))
+
+
+def bench_dispatch(infile, number, debug):
+    media_file = isobmff.MediaFile(infile, debug)
+    media_file.read()
+    box_types = get_box_types(media_file)
+    print(f"file: {infile} boxes: {len(box_types)}")
+    legacy_us = bench(legacy_dispatch, box_types, max(1, number // 100))
+    registry_us = bench(registry_dispatch, box_types, number)
+    print(f"  linear scan: {legacy_us:10.3f} us/box")
+    print(f"  registry:    {registry_us:10.3f} us/box")
+    print(f"  speedup:     {legacy_us / registry_us:10.1f}x")
+
+
+# pre-struct read() implementations: one read_uint() call per field
+def legacy_read_mvhd(box, file):
+    read_size = 8 if box.version == 1 else 4
+    box.creation_time = read_uint(file, read_size)
+    box.modification_time = read_uint(file, read_size)
+    box.timescale = read_uint(file, 4)
+    box.duration = read_uint(file, read_size)
+    box.rate = read_uint(file, 4)
+    box.volume = read_uint(file, 2)
+    box.reserved1 = read_uint(file, 2)
+    box.reserved2 = [read_uint(file, 4) for _ in range(2)]
+    box.matrix = [read_uint(file, 4) for _ in range(9)]
+    box.pre_defined = [read_uint(file, 4) for _ in range(6)]
+    box.next_track_id = read_uint(file, 4)
+
+
+def legacy_read_tkhd(box, file):
+    read_size = 8 if box.version == 1 else 4
+    box.creation_time = read_uint(file, read_size)
+    box.modification_time = read_uint(file, read_size)
+    box.track_id = read_uint(file, 4)
+    box.reserved1 = read_uint(file, 4)
+    box.duration = read_uint(file, read_size)
+    box.reserved2 = [read_uint(file, 4) for _ in range(2)]
+    box.layer = read_sint(file, 2)
+    box.alternate_group = read_uint(file, 2)
+    box.volume = read_uint(file, 2)
+    box.reserved3 = read_uint(file, 2)
+    box.matrix = [read_uint(file, 4) for _ in range(9)]
+    box.width = read_uint(file, 4)
+    box.height = read_uint(file, 4)
+
+
+def legacy_read_sidx(box, file):
+    box.reference_ID = read_uint(file, 4)
+    box.timescale = read_uint(file, 4)
+    count_size = 4 if box.version == 0 else 8
+    box.earliest_presentation_time = read_uint(file, count_size)
+    box.first_offset = read_uint(file, count_size)
+    box.reserved = read_uint(file, 2)
+    reference_count = read_uint(file, 2)
+    box.references = []
+    for _ in range(reference_count):
+        reference = {}
+        word1 = read_uint(file, 4)
+        reference["reference_type"] = word1 >> 31
+        reference["reference_size"] = word1 & 0x7FFFFFFF
+        reference["subsegment_duration"] = read_uint(file, 4)
+        word2 = read_uint(file, 4)
+        reference["starts_with_SAP"] = word2 >> 31
+        reference["SAP_type"] = (word2 >> 28) & 0x7
+        reference["SAP_delta_time"] = word2 & 0x0FFFFFFF
+        box.references.append(reference)
+
+
+def legacy_read_visual_sample_entry(box, file):
+    box.reserved0 = [read_uint(file, 1) for _ in range(6)]
+    box.data_reference_index = read_uint(file, 2)
+    box.pre_defined1 = read_uint(file, 2)
+    box.reserved1 = read_uint(file, 2)
+    box.pre_defined2 = [read_uint(file, 4) for _ in range(3)]
+    box.width = read_uint(file, 2)
+    box.height = read_uint(file, 2)
+    box.horizresolution = read_uint(file, 4)
+    box.vertresolution = read_uint(file, 4)
+    box.reserved2 = read_uint(file, 4)
+    box.frame_count = read_uint(file, 2)
+    box.compressorname = read_fixed_size_string(file, 32)
+    box.depth = read_uint(file, 2)
+    box.pre_defined3 = read_sint(file, 2)
+    box.box_list = box.read_box_list(file)
+
+
+def make_box(box_type, payload, version=None):
+    if version is not None:
+        payload = struct.pack(">I", version << 24) + payload
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+MATRIX = struct.pack(">9I", 0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+
+BULK_BOXES = (
+    (
+        "mvhd",
+        make_box(
+            b"mvhd",
+            struct.pack(">IIIIIHH2I", 1, 2, 1000, 1000, 0x10000, 0x100, 0, 0, 0)
+            + MATRIX
+            + bytes(24)
+            + struct.pack(">I", 2),
+            version=0,
+        ),
+        legacy_read_mvhd,
+    ),
+    (
+        "tkhd",
+        make_box(
+            b"tkhd",
+            struct.pack(">IIIII2IhHHH", 1, 2, 1, 0, 1000, 0, 0, 0, 0, 0, 0)
+            + MATRIX
+            + struct.pack(">II", 640 << 16, 480 << 16),
+            version=0,
+        ),
+        legacy_read_tkhd,
+    ),
+    (
+        "sidx",
+        make_box(
+            b"sidx",
+            struct.pack(">IIIIHH", 1, 1000, 0, 0, 0, 100)
+            + struct.pack(">III", 10000, 1000, 0x90000000) * 100,
+            version=0,
+        ),
+        legacy_read_sidx,
+    ),
+    (
+        "avc1",
+        make_box(
+            b"avc1",
+            bytes(6)
+            + struct.pack(">HHH3IHHIIIH", 1, 0, 0, 0, 0, 0, 640, 480, 0, 0, 0, 1)
+            + bytes(32)
+            + struct.pack(">Hh", 0x18, -1),
+        ),
+        legacy_read_visual_sample_entry,
+    ),
+)
+
+
+def bench_bulk(number, debug):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, data, legacy_read in BULK_BOXES:
+            filename = os.path.join(tmpdir, name)
+            with open(filename, "wb") as fout:
+                fout.write(data)
+            parent = isobmff.MediaFile(filename, debug)
+            with open(filename, "rb") as file:
+                box = read_box(file, "", debug, parent)
+                body_offset = box.get_body_offset()
+
+                def per_field():
+                    file.seek(body_offset)
+                    legacy_read(box, file)
+
+                def bulk_struct():
+                    file.seek(body_offset)
+                    box.read_bulk(file)
+
+                timer = timeit.Timer(per_field)
+                per_field_us = min(timer.repeat(repeat=3, number=number))
+                timer = timeit.Timer(bulk_struct)
+                bulk_us = min(timer.repeat(repeat=3, number=number))
+            per_field_us *= 1e6 / number
+            bulk_us *= 1e6 / number
+            print(
+                f"{name}: per-field: {per_field_us:8.3f} us/box "
+                f"bulk+struct: {bulk_us:8.3f} us/box "
+                f"speedup: {per_field_us / bulk_us:5.1f}x"
+            )
+
+
+def bench_memory(infile, number, debug):
+    # keep number copies of the box tree, so per-file costs are amortized
+    copies = max(1, number // 100)
+    tracemalloc.start()
+    start_size, _ = tracemalloc.get_traced_memory()
+    media_files = []
+    for _ in range(copies):
+        media_file = isobmff.MediaFile(infile, debug)
+        media_file.read()
+        media_files.append(media_file)
+    end_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    num_boxes = len(get_box_types(media_files[0])) * copies
+    print(f"file: {infile} copies: {copies} boxes: {num_boxes}")
+    print(f"  memory:      {end_size - start_size:10d} bytes")
+    print(f"  per box:     {(end_size - start_size) / num_boxes:10.1f} bytes/box")
+    # instance size (object plus __dict__, without the field values) of
+    # each box class, most frequent first. Classes with __slots__ have
+    # no __dict__
+    class_sizes = {}
+
+    def walk(box):
+        size = sys.getsizeof(box)
+        if hasattr(box, "__dict__"):
+            size += sys.getsizeof(box.__dict__)
+        count, total = class_sizes.get(type(box), (0, 0))
+        class_sizes[type(box)] = (count + 1, total + size)
+        for child in get_subboxes(box):
+            walk(child)
+
+    for box in media_files[0].box_list:
+        walk(box)
+    print(f"  {'class':40s} {'boxes':>8s} {'bytes/box':>10s} {'dict':>5s}")
+    for cls, (count, total) in sorted(
+        class_sizes.items(), key=lambda item: item[1][0], reverse=True
+    ):
+        has_dict = "__dict__" in dir(cls)
+        print(
+            f"  {cls.__name__:40s} {count:8d} {total / count:10.1f} "
+            f"{'yes' if has_dict else 'no':>5s}"
+        )
+
+
+def get_options(argv):
+    """Generic option parser.
+
+    Args:
+        argv: list containing arguments
+
+    Returns:
+        Namespace - An argparse.ArgumentParser-generated option object
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "-v",
+        "--version",
+        action="store_true",
+        dest="version",
+        default=False,
+        help="Print version",
+    )
+    parser.add_argument(
+        "-d",
+        "--debug",
+        action="count",
+        dest="debug",
+        default=default_values["debug"],
+        help="Increase verbosity (use multiple times for more)",
+    )
+    parser.add_argument(
+        "--func",
+        type=str,
+        nargs="?",
+        default=default_values["func"],
+        choices=FUNC_CHOICES.keys(),
+        help="%s"
+        % (" | ".join("{}: {}".format(k, v) for k, v in FUNC_CHOICES.items())),
+    )
+    for key, val in FUNC_CHOICES.items():
+        parser.add_argument(
+            f"--{key}",
+            action="store_const",
+            dest="func",
+            const=f"{key}",
+            help=val,
+        )
+    parser.add_argument(
+        "-n",
+        "--number",
+        type=int,
+        default=default_values["number"],
+        metavar="number",
+        help="number of iterations",
+    )
+    parser.add_argument(
+        "-i",
+        "--infile",
+        type=str,
+        default=default_values["infile"],
+        metavar="input-file",
+        help="input file",
+    )
+    options = parser.parse_args(argv[1:])
+    return options
+
+
+def main(argv):
+    # 0. parse options
+    options = get_options(argv)
+    if options.version:
+        print("version: %s" % __version__)
+        sys.exit(0)
+    if options.debug > 0:
+        print(options)
+
+    # 1. run the benchmark
+    if options.func == "dispatch":
+        bench_dispatch(options.infile, options.number, options.debug)
+    elif options.func == "bulk":
+        bench_bulk(options.number, options.debug)
+    elif options.func == "memory":
+        bench_memory(options.infile, options.number, options.debug)
+
+
+if __name__ == "__main__":
+    # at least the CLI program name: (CLI) execution
+    main(sys.argv)
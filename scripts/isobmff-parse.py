@@ -5,8 +5,10 @@ ISO/IEC 14496-12) parser."""
 
 import argparse
 import glob
+import multiprocessing
 import os
 import pathlib
+import signal
 import sys
 
 dirname = os.path.dirname(sys.modules[__name__].__file__)
@@ -18,46 +20,139 @@ import isobmff
 
 __version__ = "0.1"
 
+# read size for non-seekable streams (see parse_stream())
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# largest number of files sent at once to a worker (see parse_files())
+MAX_CHUNKSIZE = 64
+
 FUNC_CHOICES = {
     "parse": "parse isobmff input",
     "extract-box": "extract full box by name",
     "extract-value": "extract box payload by name",
     "list-items": "list item IDs and their types",
     "extract-item": "extract contents of item with item ID",
+    "extract-preview": "extract the smallest thumbnail (or primary item), "
+    "reading only the meta box and its data (coded images only)",
+    "scan": "list box headers (fast scan, no box parsing)",
 }
 
 default_values = {
     "debug": 0,
     "dry_run": False,
+    "lazy": False,
+    "use_mmap": False,
+    "bulk": False,
+    "cache_dir": None,
+    "include": None,
+    "exclude": None,
     "func": "parse",
     "testdir": None,
     "listfile": None,
+    "jobs": 1,
+    "timeout": None,
     "path": None,
     "item_id": None,
+    "allow_external": False,
     "infile": None,
     "outfile": None,
 }
 
 
-def parse_file(infile, debug):
-    media_file = isobmff.MediaFile(infile, debug)
-    media_file.read()
+def parse_file(
+    infile,
+    debug,
+    lazy=False,
+    use_mmap=False,
+    bulk=False,
+    cache_dir=None,
+    include=None,
+    exclude=None,
+):
+    cache = isobmff.BoxCache(cache_dir) if cache_dir is not None else None
+    media_file = isobmff.MediaFile(
+        infile, debug, lazy=lazy, use_mmap=use_mmap, bulk=bulk, cache=cache
+    )
+    media_file.read(include=include, exclude=exclude)
     return media_file
 
 
-def test_file_of_files(listfile, debug):
+def parse_stream(stream, debug):
+    # parse a non-seekable stream (e.g. a pipe), printing the top-level
+    # boxes as they are completed
+    parser = isobmff.PushParser(debug)
+    while True:
+        data = stream.read(STREAM_CHUNK_SIZE)
+        if not data:
+            break
+        for box in parser.feed(data):
+            print_box(box)
+    for box in parser.close():
+        print_box(box)
+    print()
+
+
+def print_box(box):
+    # same format as print(media_file)
+    tuples = (("box", box.contents()),)
+    print(isobmff.box.tuples_to_string(tuples, indent=0), end="")
+
+
+def parse_file_safe(infile, debug, timeout=None, parse_options=None):
+    # parse a file, and get the error message (None if no error).
+    # parse_options are the keyword arguments of parse_file()
+    def raise_timeout(signum, frame):
+        raise TimeoutError(f"error: timeout after {timeout} seconds")
+
+    if timeout is not None:
+        previous_handler = signal.signal(signal.SIGALRM, raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        media_file = parse_file(infile, debug, **(parse_options or {}))
+        media_file.close()
+    except Exception as exc:
+        return str(exc.args[0]) if exc.args else repr(exc)
+    finally:
+        if timeout is not None:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+    return None
+
+
+def parse_file_task(task):
+    infile, debug, timeout, parse_options = task
+    return infile, parse_file_safe(infile, debug, timeout, parse_options)
+
+
+def parse_files(filelist, debug, jobs=1, timeout=None, parse_options=None):
+    """parse a list of files
+
+    Yields (filename, error) tuples as files are parsed (error is None
+    for files parsed correctly). parse_options are the keyword arguments
+    of parse_file() (e.g. lazy, use_mmap, bulk, include, exclude). With
+    jobs > 1, files are distributed in chunks to a pool of worker
+    processes, and results come in completion order.
+    """
+    tasks = [(infile, debug, timeout, parse_options) for infile in filelist]
+    if jobs == 1:
+        yield from map(parse_file_task, tasks)
+        return
+    # small chunks keep workers busy until the end of the list
+    chunksize = max(1, min(MAX_CHUNKSIZE, len(tasks) // (jobs * 4)))
+    with multiprocessing.Pool(jobs) as pool:
+        yield from pool.imap_unordered(parse_file_task, tasks, chunksize)
+
+
+def test_file_of_files(listfile, debug, jobs=1, timeout=None, parse_options=None):
     # read the list of input files from the input file
     error_list = []
     with open(listfile, "r") as f:
-        for infile in f.readlines():
-            # parse the input file
-            infile = infile.strip()
-            print(f"### parsing {infile}")
-            try:
-                _ = parse_file(infile, debug)
-            except:
-                print(f"    error on {infile}")
-                error_list.append(infile)
+        filelist = [infile.strip() for infile in f.readlines()]
+    for infile, error in parse_files(filelist, debug, jobs, timeout, parse_options):
+        print(f"### parsing {infile}")
+        if error is not None:
+            print(f"    error on {infile}")
+            error_list.append(infile)
     # dump the list of broken input files
     if error_list:
         print("BROKEN FILES")
@@ -83,21 +178,18 @@ def get_list_of_isobmff_files(testdir, debug):
     return filelist
 
 
-def test_directory(testdir, debug):
+def test_directory(testdir, debug, jobs=1, timeout=None, parse_options=None):
     # 1. get the list of isobmff files
     filelist = get_list_of_isobmff_files(testdir, debug)
     # 2. parse them all
     error_list = {}
-    for fname in filelist:
-        # parse the input file
+    for fname, error in parse_files(filelist, debug, jobs, timeout, parse_options):
         if debug > 1:
             print(f"### parsing {fname}")
-        try:
-            _ = parse_file(fname, debug)
-        except Exception as exc:
+        if error is not None:
             if debug > 0:
                 print(f"    error on {fname}")
-            error_list[fname] = exc.args[0]
+            error_list[fname] = error
     # 3. dump the list of broken input files
     if error_list:
         print("# BROKEN FILES")
@@ -106,11 +198,9 @@ def test_directory(testdir, debug):
             print(f"{error}")
 
 
-def extract_bytes(infile, offset, size, outfile, debug):
+def extract_bytes(media_file, offset, size, outfile, debug):
     # read the bytes
-    with open(infile, "rb") as fin:
-        fin.seek(offset)
-        data = fin.read(size)
+    data = media_file.get_bytes(offset, size)
     # write the bytes
     with open(outfile, "wb") as fout:
         fout.write(data)
@@ -124,13 +214,13 @@ def extract_box(media_file, path, outfile, include_headers, debug):
         sys.exit(-1)
     # extract the expected bytes
     start_offset = box.offset if include_headers else box.payload_offset
-    size = box.size
+    size = box.get_size()
     if not include_headers:
         size -= start_offset - box.offset
-    extract_bytes(media_file.filename, start_offset, size, outfile, debug)
+    extract_bytes(media_file, start_offset, size, outfile, debug)
 
 
-def process_items(media_file, outfile, input_item_id, debug):
+def process_items(media_file, outfile, input_item_id, allow_external, debug):
     # 1. look for the item-related boxes
     iloc_box = media_file.find_subbox("/meta/iloc")
     assert iloc_box is not None, "error: cannot find /meta/iloc"
@@ -146,39 +236,83 @@ def process_items(media_file, outfile, input_item_id, debug):
         item_info.item_id: (item_info.item_type, item_info.path)
         for item_info in iinf_box.item_infos
     }
-    # 2.3. item locations from iloc box
-    item_locations = {
-        item["item_id"]: (
-            (0 if not item["base_offset"] else item["base_offset"])
-            + item["extents"][0]["extent_offset"],
-            item["extents"][0]["extent_length"],
-        )
-        for item in iloc_box.items
-    }
-    # 3. merge the data
-    items = {}
-    item_ids = set(item_types.keys()) & set(item_locations.keys())
-    for item_id in item_ids:
-        item_type, path = item_types[item_id]
-        primary = 1 if item_id == pitm_item_id else 0
-        offset, length = item_locations[item_id]
-        items[item_id] = (item_type, path, primary, offset, length)
-    # 4. print the data
-    if input_item_id is None:
-        # list items
-        if outfile is None or outfile == "-":
-            outfile = "/dev/fd/1"
-        with open(outfile, "w") as fout:
-            fout.write("item_id,path,item_type,primary,offset,length\n")
-            for item_id, (item_type, path, primary, offset, length) in items.items():
-                fout.write(
-                    f"{item_id},{path},{item_type},{primary},{offset},{length}\n"
-                )
-    else:
-        # extract item
-        assert input_item_id in item_ids, f"error: invalid item id: {input_item_id}"
-        _, _, _, start_offset, size = items[input_item_id]
-        extract_bytes(media_file.filename, start_offset, size, outfile, debug)
+    # 2.3. item locations (all extents, any construction method)
+    item_reader = isobmff.ItemReader(media_file, allow_external=allow_external)
+    item_ids = set(item_types.keys()) & set(item_reader.get_item_ids())
+    with item_reader:
+        # 3. print the data
+        if input_item_id is None:
+            # list items: offset of the first extent, and total length
+            if outfile is None or outfile == "-":
+                outfile = "/dev/fd/1"
+            with open(outfile, "w") as fout:
+                fout.write("item_id,path,item_type,primary,offset,length,extents\n")
+                for item_id in sorted(item_ids):
+                    item_type, path = item_types[item_id]
+                    primary = 1 if item_id == pitm_item_id else 0
+                    if item_reader.is_external(item_id) and not allow_external:
+                        # the location of external data is not resolved
+                        fout.write(f"{item_id},{path},{item_type},{primary},,,\n")
+                        continue
+                    extents = item_reader.get_extents(item_id)
+                    offset = extents[0][1] if extents else 0
+                    length = sum(extent[2] for extent in extents)
+                    fout.write(
+                        f"{item_id},{path},{item_type},{primary},{offset},{length},"
+                        f"{len(extents)}\n"
+                    )
+        else:
+            # extract item
+            assert (
+                input_item_id in item_ids
+            ), f"error: invalid item id: {input_item_id}"
+            if outfile is None or outfile == "-":
+                outfile = "/dev/fd/1"
+            with open(outfile, "wb") as fout:
+                item_reader.read_item_into(input_item_id, fout)
+
+
+def extract_preview(infile, outfile, allow_external, debug):
+    with isobmff.PreviewReader(
+        infile, debug, allow_external=allow_external
+    ) as preview_reader:
+        item_id = preview_reader.get_preview_item_id()
+        # derived images (e.g. "grid") need their inputs, which do not
+        # fit in a single output file
+        item_references = preview_reader.item_references
+        input_item_ids = list(item_references.get_derived_inputs(item_id))
+        if input_item_ids:
+            raise Exception(
+                f"error: preview item {item_id} is a derived image of items "
+                f"{input_item_ids}: use --extract-item for each of them"
+            )
+        data = preview_reader.read_items([item_id])[item_id]
+        if debug > 0:
+            print(
+                f"item_id: {item_id} size: {len(data)} bytes_read: "
+                f"{preview_reader.bytes_read} read_count: {preview_reader.read_count}",
+                file=sys.stderr,
+            )
+    if outfile is None or outfile == "-":
+        outfile = "/dev/fd/1"
+    with open(outfile, "wb") as fout:
+        fout.write(data)
+
+
+def scan_file(infile, outfile, debug):
+    index = isobmff.scan(infile)
+    paths = index.get_paths()
+    if outfile is None or outfile == "-":
+        outfile = "/dev/fd/1"
+    with open(outfile, "w") as fout:
+        fout.write("index,offset,header_size,size,fourcc,depth,parent_index,path\n")
+        for idx, entry in enumerate(index):
+            offset, header_size, size, fourcc, depth, parent_index = entry
+            fourcc = isobmff.box.decode_posix_portable_filename(fourcc)
+            fout.write(
+                f"{idx},{offset},{header_size},{size},{fourcc},"
+                f"{depth},{parent_index},{paths[idx]}\n"
+            )
 
 
 def get_options(argv):
@@ -226,6 +360,53 @@ def get_options(argv):
         default=default_values["dry_run"],
         help="Dry run",
     )
+    parser.add_argument(
+        "--lazy",
+        action="store_true",
+        dest="lazy",
+        default=default_values["lazy"],
+        help="Read box payloads only when needed",
+    )
+    parser.add_argument(
+        "--mmap",
+        action="store_true",
+        dest="use_mmap",
+        default=default_values["use_mmap"],
+        help="Parse from a memory map of the input file",
+    )
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        dest="bulk",
+        default=default_values["bulk"],
+        help="Read each box payload at once, and parse it from memory",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        dest="cache_dir",
+        default=default_values["cache_dir"],
+        metavar="cache-dir",
+        help="cache parsed box trees in this directory",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        type=str,
+        dest="include",
+        default=default_values["include"],
+        metavar="path-glob",
+        help="only read boxes matching this path glob (e.g. /moov/trak*/tkhd)",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        type=str,
+        dest="exclude",
+        default=default_values["exclude"],
+        metavar="path-glob",
+        help="do not read boxes matching this path glob (e.g. /moof*)",
+    )
     parser.add_argument(
         "--func",
         type=str,
@@ -258,6 +439,14 @@ def get_options(argv):
         metavar="item_id",
         help="item id",
     )
+    parser.add_argument(
+        "--allow-external-data",
+        action="store_true",
+        dest="allow_external",
+        default=default_values["allow_external"],
+        help="read item data in external files (dref entries) next to the "
+        "input file",
+    )
     parser.add_argument(
         "--testdir",
         type=str,
@@ -272,13 +461,29 @@ def get_options(argv):
         metavar="list-file",
         help="list file",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=default_values["jobs"],
+        metavar="jobs",
+        help="number of parallel parsing processes for --testdir/--listfile "
+        "(0 for one per CPU)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=default_values["timeout"],
+        metavar="seconds",
+        help="per-file parsing timeout for --testdir/--listfile",
+    )
     parser.add_argument(
         "-i",
         "--infile",
         type=str,
         default=default_values["infile"],
         metavar="input-file",
-        help="input file",
+        help='input file ("-" to parse stdin as a stream)',
     )
     parser.add_argument(
         "-o",
@@ -290,6 +495,8 @@ def get_options(argv):
     )
     # do the parsing
     options = parser.parse_args(argv[1:])
+    if options.jobs == 0:
+        options.jobs = os.cpu_count()
     if options.version:
         return options
     # implement help
@@ -309,15 +516,52 @@ def main(argv):
         print(options)
 
     # 1. run test cases
+    parse_options = {
+        "lazy": options.lazy,
+        "use_mmap": options.use_mmap,
+        "bulk": options.bulk,
+        "cache_dir": options.cache_dir,
+        "include": options.include,
+        "exclude": options.exclude,
+    }
     if options.listfile is not None:
-        test_file_of_files(options.listfile, options.debug)
+        test_file_of_files(
+            options.listfile,
+            options.debug,
+            options.jobs,
+            options.timeout,
+            parse_options,
+        )
         sys.exit()
     elif options.testdir is not None:
-        test_directory(options.testdir, options.debug)
+        test_directory(
+            options.testdir,
+            options.debug,
+            options.jobs,
+            options.timeout,
+            parse_options,
+        )
+        sys.exit()
+
+    # 2. scan the input file (no box parsing)
+    if options.func == "scan":
+        scan_file(options.infile, options.outfile, options.debug)
+        sys.exit()
+
+    # 2.1. extract a preview (only the meta box is parsed)
+    if options.func == "extract-preview":
+        extract_preview(
+            options.infile, options.outfile, options.allow_external, options.debug
+        )
+        sys.exit()
+
+    # 3. parse a non-seekable stream
+    if options.infile == "-" and options.func == "parse":
+        parse_stream(sys.stdin.buffer, options.debug)
         sys.exit()
 
-    # 2. parse the input file
-    media_file = parse_file(options.infile, options.debug)
+    # 4. parse the input file
+    media_file = parse_file(options.infile, options.debug, **parse_options)
 
     if options.func == "parse":
         print(media_file)
@@ -329,7 +573,15 @@ def main(argv):
         )
 
     elif options.func in ["list-items", "extract-item"]:
-        process_items(media_file, options.outfile, options.item_id, options.debug)
+        process_items(
+            media_file,
+            options.outfile,
+            options.item_id,
+            options.allow_external,
+            options.debug,
+        )
+
+    media_file.close()
 
 
 if __name__ == "__main__":
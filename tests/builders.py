@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""Builders of small synthetic ISOBMFF files for the tests.
+
+Each builder returns the file bytes along with the expected layout
+(where every sample or item byte was written), so the tests can check
+the indexes against a naive join of the written data.
+"""
+import struct
+
+
+def box(box_type, payload=b""):
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def full_box(box_type, version, flags, payload=b""):
+    return box(box_type, struct.pack(">I", (version << 24) | flags) + payload)
+
+
+# ISO/IEC 14496-12:2022, Section 8.8.7.1: "tfhd" flags
+TFHD_BASE_DATA_OFFSET_PRESENT = 0x000001
+TFHD_DEFAULT_BASE_IS_MOOF = 0x020000
+
+# ISO/IEC 14496-12:2022, Section 8.8.8.1: "trun" flags
+TRUN_DATA_OFFSET_PRESENT = 0x000001
+TRUN_SAMPLE_SIZE_PRESENT = 0x000200
+
+# "trex" defaults of the fragmented tracks
+DEFAULT_SAMPLE_DURATION = 512
+DEFAULT_SAMPLE_SIZES = {1: 100, 2: 50}
+
+
+def sample_payload(track_id, index, size):
+    """data of a sample, different for every (track, sample) pair"""
+    return bytes([(track_id * 64 + index) % 256]) * size
+
+
+def mvhd():
+    payload = struct.pack(">IIIIIHH2I", 0, 0, 1000, 0, 0x10000, 0x100, 0, 0, 0)
+    payload += struct.pack(">9I", 0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+    payload += b"\0" * 24 + struct.pack(">I", 3)
+    return full_box(b"mvhd", 0, 0, payload)
+
+
+def trak(track_id):
+    payload = struct.pack(">IIIII", 0, 0, track_id, 0, 0)
+    payload += struct.pack(">2IhHHH", 0, 0, 0, 0, 0, 0)
+    payload += struct.pack(">9I", 0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+    payload += struct.pack(">II", 0, 0)
+    tkhd = full_box(b"tkhd", 0, 3, payload)
+    mdhd = full_box(b"mdhd", 0, 0, struct.pack(">IIIIHH", 0, 0, 12800, 0, 0x55C4, 0))
+    return box(b"trak", tkhd + box(b"mdia", mdhd))
+
+
+def moov(track_ids):
+    trexs = b"".join(
+        full_box(
+            b"trex",
+            0,
+            0,
+            struct.pack(
+                ">5I",
+                track_id,
+                1,
+                DEFAULT_SAMPLE_DURATION,
+                DEFAULT_SAMPLE_SIZES[track_id],
+                0,
+            ),
+        )
+        for track_id in track_ids
+    )
+    traks = b"".join(trak(track_id) for track_id in track_ids)
+    return box(b"moov", mvhd() + traks + box(b"mvex", trexs))
+
+
+def trun(sizes, data_offset=None, sample_count=None):
+    """sizes None uses the default sample size"""
+    flags = 0
+    payload = b""
+    if data_offset is not None:
+        flags |= TRUN_DATA_OFFSET_PRESENT
+        payload += struct.pack(">i", data_offset)
+    if sizes is not None:
+        flags |= TRUN_SAMPLE_SIZE_PRESENT
+        payload += b"".join(struct.pack(">I", size) for size in sizes)
+        sample_count = len(sizes)
+    return full_box(b"trun", 0, flags, struct.pack(">I", sample_count) + payload)
+
+
+def build_fragmented(fragments, base="moof"):
+    """build a single-track fragmented file
+
+    fragments is a list of fragments, each a list of runs, each a list
+    of sample sizes. base selects how the sample data is located:
+
+    * "moof": default-base-is-moof, with a data offset in the first run
+    * "explicit": base_data_offset in "tfhd", with a data offset in the
+      first run
+    * "first": no "tfhd" flags, so the first track fragment is based
+      at the start of the "moof" box, with a data offset in the first
+      run
+
+    The next runs never have a data offset, so their data follows the
+    data of the previous run. Returns (data, samples), where samples is
+    the list of (offset, payload) of the track 1 samples, in order.
+    """
+    out = box(b"ftyp", b"iso6" + struct.pack(">I", 0) + b"iso6")
+    out += moov([1])
+    samples = []
+    for fragment_number, runs in enumerate(fragments, 1):
+        moof_offset = len(out)
+
+        def make_moof(data_offset):
+            if base == "moof":
+                tfhd = full_box(b"tfhd", 0, TFHD_DEFAULT_BASE_IS_MOOF, b"\0\0\0\1")
+            elif base == "explicit":
+                tfhd = full_box(
+                    b"tfhd",
+                    0,
+                    TFHD_BASE_DATA_OFFSET_PRESENT,
+                    struct.pack(">IQ", 1, moof_offset),
+                )
+            else:
+                tfhd = full_box(b"tfhd", 0, 0, b"\0\0\0\1")
+            truns = [
+                trun(sizes, data_offset if index == 0 else None)
+                for index, sizes in enumerate(runs)
+            ]
+            traf = box(b"traf", tfhd + b"".join(truns))
+            mfhd = full_box(b"mfhd", 0, 0, struct.pack(">I", fragment_number))
+            return box(b"moof", mfhd + traf)
+
+        moof = make_moof(0)
+        moof = make_moof(len(moof) + 8)
+        data_start = moof_offset + len(moof) + 8
+        data = b""
+        for sizes in runs:
+            for size in sizes:
+                payload = sample_payload(1, len(samples), size)
+                samples.append((data_start + len(data), payload))
+                data += payload
+        out += moof + box(b"mdat", data)
+    return out, samples
+
+
+def build_two_tracks(fragment_count):
+    """build a fragmented file with two tracks in each "moof"
+
+    The track 2 fragment comes first, with an explicit data offset and
+    3 samples, and the track 1 fragment follows with 4 samples and no
+    data offset, so its data starts at the end of the track 2 data.
+    Sample sizes come from the "trex" defaults. Returns (data, samples),
+    where samples maps each track ID to its list of (offset, payload).
+    """
+    out = box(b"ftyp", b"iso6" + struct.pack(">I", 0) + b"iso6")
+    out += moov([1, 2])
+    samples = {1: [], 2: []}
+    counts = {2: 3, 1: 4}
+    for fragment_number in range(1, fragment_count + 1):
+
+        def make_moof(data_offset):
+            traf2 = box(
+                b"traf",
+                full_box(b"tfhd", 0, 0, struct.pack(">I", 2))
+                + trun(None, data_offset, counts[2]),
+            )
+            traf1 = box(
+                b"traf",
+                full_box(b"tfhd", 0, 0, struct.pack(">I", 1))
+                + trun(None, None, counts[1]),
+            )
+            mfhd = full_box(b"mfhd", 0, 0, struct.pack(">I", fragment_number))
+            return box(b"moof", mfhd + traf2 + traf1)
+
+        moof = make_moof(0)
+        moof = make_moof(len(moof) + 8)
+        data_start = len(out) + len(moof) + 8
+        data = b""
+        for track_id in (2, 1):
+            for _ in range(counts[track_id]):
+                size = DEFAULT_SAMPLE_SIZES[track_id]
+                payload = sample_payload(track_id, len(samples[track_id]), size)
+                samples[track_id].append((data_start + len(data), payload))
+                data += payload
+        out += moof + box(b"mdat", data)
+    return out, samples
+
+
+# data of the items in "mdat" (item 1, in two extents) and "idat"
+ITEM_1_EXTENTS = (bytes(range(100)), bytes(range(100, 150)))
+IDAT_DATA = b"EXIFDATA12345678" + b"GRIDDATA"
+
+
+def iref_entry(reference_type, from_item_id, to_item_ids):
+    payload = struct.pack(">HH", from_item_id, len(to_item_ids))
+    payload += b"".join(struct.pack(">H", item_id) for item_id in to_item_ids)
+    return box(reference_type, payload)
+
+
+def build_heif(external_location="ext.bin"):
+    """build a HEIF-like file with items of every construction method
+
+    * item 1: construction_method 0, two extents in "mdat"
+    * item 2: construction_method 0, with a base_offset
+    * items 3, 4: construction_method 1, ranges of "idat"
+    * item 5: construction_method 1, extent_length 0 (to the end of
+      "idat"), with a base_offset
+    * item 6: construction_method 2, ranges of item 1 (the second one
+      spans both item 1 extents)
+    * item 7: construction_method 2, extent_length 0 (to the end of
+      item 1)
+    * item 8: construction_method 0, in the external_location file
+      (second "dref" entry)
+
+    Returns (data, extents), where extents maps the item ID of the
+    items in this file to the list of (offset, length) where their
+    data was written, as given (without merging adjacent ranges).
+    """
+    ftyp = box(b"ftyp", b"heic" + struct.pack(">I", 0) + b"mif1heic")
+    item_2_data = b"item 2 data"
+
+    def make_meta(mdat_start):
+        item_1_offsets = (mdat_start, mdat_start + len(ITEM_1_EXTENTS[0]))
+        item_2_offset = item_1_offsets[1] + len(ITEM_1_EXTENTS[1])
+        # (item_id, construction_method, data_reference_index,
+        # base_offset, [(extent_index, extent_offset, extent_length)])
+        items = [
+            (
+                1,
+                0,
+                0,
+                0,
+                [
+                    (0, item_1_offsets[0], len(ITEM_1_EXTENTS[0])),
+                    (0, item_1_offsets[1], len(ITEM_1_EXTENTS[1])),
+                ],
+            ),
+            (2, 0, 0, mdat_start, [(0, item_2_offset - mdat_start, 11)]),
+            (3, 1, 0, 0, [(0, 0, 16)]),
+            (4, 1, 0, 0, [(0, 16, 8)]),
+            (5, 1, 0, 16, [(0, 0, 0)]),
+            (6, 2, 0, 0, [(1, 10, 20), (1, 95, 10)]),
+            (7, 2, 0, 140, [(1, 0, 0)]),
+            (8, 0, 2, 0, [(0, 3, 4)]),
+        ]
+        # version 1, 4-byte offset, length, base_offset, and index fields
+        iloc = struct.pack(">BBH", 0x44, 0x44, len(items))
+        for item_id, construction_method, data_reference_index, base, extents in items:
+            iloc += struct.pack(
+                ">HHHIH",
+                item_id,
+                construction_method,
+                data_reference_index,
+                base,
+                len(extents),
+            )
+            for extent in extents:
+                iloc += struct.pack(">III", *extent)
+        iloc = full_box(b"iloc", 1, 0, iloc)
+        references = iref_entry(b"iloc", 6, [1]) + iref_entry(b"iloc", 7, [1])
+        iref = full_box(b"iref", 0, 0, references)
+        dref = full_box(
+            b"dref",
+            0,
+            0,
+            struct.pack(">I", 2)
+            + full_box(b"url ", 0, 1)
+            + full_box(b"url ", 0, 0, external_location.encode() + b"\0"),
+        )
+        hdlr = full_box(b"hdlr", 0, 0, b"\0\0\0\0pict" + b"\0" * 13)
+        pitm = full_box(b"pitm", 0, 0, struct.pack(">H", 1))
+        payload = hdlr + box(b"dinf", dref) + pitm + iloc + iref
+        payload += box(b"idat", IDAT_DATA)
+        meta = full_box(b"meta", 0, 0, payload)
+        extents = {
+            1: [
+                (offset, len(data))
+                for offset, data in zip(item_1_offsets, ITEM_1_EXTENTS)
+            ],
+            2: [(item_2_offset, len(item_2_data))],
+        }
+        return meta, extents
+
+    meta, _ = make_meta(0)
+    mdat_start = len(ftyp) + len(meta) + 8
+    meta, extents = make_meta(mdat_start)
+    idat_offset = len(ftyp) + len(meta) - len(IDAT_DATA)
+    extents[3] = [(idat_offset, 16)]
+    extents[4] = [(idat_offset + 16, 8)]
+    extents[5] = [(idat_offset + 16, len(IDAT_DATA) - 16)]
+    mdat = box(b"mdat", b"".join(ITEM_1_EXTENTS) + item_2_data)
+    return ftyp + meta + mdat, extents
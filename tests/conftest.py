@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+this_dir = os.path.abspath(os.path.dirname(__file__))
+rootdir = os.path.join(this_dir, "..")
+sys.path.insert(0, rootdir)
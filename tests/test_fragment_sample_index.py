@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import isobmff
+
+from builders import DEFAULT_SAMPLE_DURATION
+from builders import build_fragmented
+from builders import build_two_tracks
+
+
+# (lazy, use_mmap, bulk) parse modes
+PARSE_MODES = [(False, False, False), (True, False, False), (False, True, False)]
+PARSE_MODES += [(False, False, True)]
+
+FRAGMENTS = [[[300, 301, 302], [303, 304]], [[310]], [[320, 321], [], [322]]]
+
+
+def read_index(path, data, track_id, lazy=False, use_mmap=False, bulk=False):
+    path.write_bytes(data)
+    media_file = isobmff.MediaFile(
+        str(path), 0, lazy=lazy, use_mmap=use_mmap, bulk=bulk
+    )
+    media_file.read()
+    try:
+        return media_file.get_fragment_sample_index(track_id)
+    finally:
+        media_file.close()
+
+
+def check_samples(path, sample_index, samples):
+    """check the index against the (offset, payload) of each sample
+    written by the builder, and the bytes at the indexed offsets"""
+    assert list(sample_index.offsets) == [offset for offset, _ in samples]
+    assert list(sample_index.sizes) == [len(payload) for _, payload in samples]
+    data = path.read_bytes()
+    for offset, size, (_, payload) in zip(
+        sample_index.offsets, sample_index.sizes, samples
+    ):
+        assert data[offset : offset + size] == payload
+
+
+@pytest.mark.parametrize("base", ["moof", "explicit", "first"])
+@pytest.mark.parametrize("lazy,use_mmap,bulk", PARSE_MODES)
+def test_fragment_offsets(tmp_path, base, lazy, use_mmap, bulk):
+    data, samples = build_fragmented(FRAGMENTS, base)
+    path = tmp_path / "frag.mp4"
+    sample_index = read_index(path, data, 1, lazy, use_mmap, bulk)
+    check_samples(path, sample_index, samples)
+    # durations come from the "trex" default
+    assert list(sample_index.durations) == [DEFAULT_SAMPLE_DURATION] * len(samples)
+    assert list(sample_index.dts) == [
+        index * DEFAULT_SAMPLE_DURATION for index in range(len(samples))
+    ]
+
+
+@pytest.mark.parametrize("track_id", [1, 2])
+def test_two_track_offsets(tmp_path, track_id):
+    # track 1 data follows the track 2 data, and its sizes come from
+    # its own "trex" box
+    data, samples = build_two_tracks(3)
+    path = tmp_path / "two.mp4"
+    sample_index = read_index(path, data, track_id)
+    check_samples(path, sample_index, samples[track_id])
+
+
+def test_add_fragment(tmp_path):
+    # fragments added one at a time give the same index
+    data, samples = build_fragmented(FRAGMENTS)
+    path = tmp_path / "frag.mp4"
+    path.write_bytes(data)
+    media_file = isobmff.MediaFile(str(path), 0)
+    media_file.read()
+    moov = media_file.find_subbox("/moov")
+    sample_index = isobmff.FragmentSampleIndex.from_movie(moov, 1)
+    for moof in media_file.find_all(b"moof"):
+        sample_index.add_fragment(moof)
+    check_samples(path, sample_index, samples)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import isobmff
+
+from builders import IDAT_DATA
+from builders import ITEM_1_EXTENTS
+from builders import build_heif
+
+
+def read_heif(path, data, allow_external=False):
+    path.write_bytes(data)
+    media_file = isobmff.MediaFile(str(path), 0)
+    media_file.read()
+    return isobmff.ItemReader(media_file, allow_external=allow_external)
+
+
+def get_byte_offsets(extents):
+    """get the file offset of every byte of a list of extents, so
+    extents are compared regardless of how adjacent ones are merged"""
+    return [
+        offset
+        for extent_offset, length in extents
+        for offset in range(extent_offset, extent_offset + length)
+    ]
+
+
+def get_item_extents(item_reader, item_id):
+    return [(offset, length) for _, offset, length in item_reader.get_extents(item_id)]
+
+
+@pytest.mark.parametrize("item_id", [1, 2, 3, 4, 5])
+def test_file_and_idat_extents(tmp_path, item_id):
+    # construction_method 0 and 1
+    data, extents = build_heif()
+    path = tmp_path / "test.heic"
+    item_reader = read_heif(path, data)
+    assert get_byte_offsets(get_item_extents(item_reader, item_id)) == (
+        get_byte_offsets(extents[item_id])
+    )
+    expected = b"".join(
+        data[offset : offset + length] for offset, length in extents[item_id]
+    )
+    assert item_reader.read_item(item_id) == expected
+    item_reader.close()
+
+
+def test_idat_data(tmp_path):
+    item_reader = read_heif(tmp_path / "test.heic", build_heif()[0])
+    assert item_reader.read_item(3) == IDAT_DATA[:16]
+    assert item_reader.read_item(4) == IDAT_DATA[16:24]
+    assert item_reader.read_item(5) == IDAT_DATA[16:]
+    item_reader.close()
+
+
+@pytest.mark.parametrize(
+    "item_id,ranges", [(6, [(10, 20), (95, 10)]), (7, [(140, 10)])]
+)
+def test_item_reference_extents(tmp_path, item_id, ranges):
+    # construction_method 2: ranges of the data of item 1, joined
+    # byte by byte from the item 1 extents
+    data, extents = build_heif()
+    item_reader = read_heif(tmp_path / "test.heic", data)
+    item_1_offsets = get_byte_offsets(extents[1])
+    item_1_data = b"".join(ITEM_1_EXTENTS)
+    expected_offsets = []
+    expected = b""
+    for offset, length in ranges:
+        expected_offsets += item_1_offsets[offset : offset + length]
+        expected += item_1_data[offset : offset + length]
+    extents = get_item_extents(item_reader, item_id)
+    assert get_byte_offsets(extents) == expected_offsets
+    assert item_reader.get_item_size(item_id) == len(expected)
+    assert item_reader.read_item(item_id) == expected
+    item_reader.close()
+
+
+def test_external_data(tmp_path):
+    data, _ = build_heif()
+    (tmp_path / "ext.bin").write_bytes(b"0123456789")
+    item_reader = read_heif(tmp_path / "test.heic", data)
+    assert item_reader.is_external(8)
+    with pytest.raises(Exception, match="external data is not allowed"):
+        item_reader.read_item(8)
+    item_reader = read_heif(tmp_path / "test.heic", data, allow_external=True)
+    assert item_reader.read_item(8) == b"3456"
+    item_reader.close()
+
+
+@pytest.mark.parametrize(
+    "location", ["../ext.bin", "/etc/passwd", "file:ext.bin", "a/../../ext.bin"]
+)
+def test_invalid_external_location(tmp_path, location):
+    data, _ = build_heif(location)
+    item_reader = read_heif(tmp_path / "test.heic", data, allow_external=True)
+    with pytest.raises(Exception, match="invalid external data location"):
+        item_reader.read_item(8)